@@ -1,4 +1,5 @@
 import dash
+import profiling
 
 external_stylesheets = [
     'https://cdnjs.cloudflare.com/ajax/libs/materialize/1.0.0/css/materialize.min.css',
@@ -17,3 +18,6 @@ app = dash.Dash(
 )
 
 server = app.server
+
+# Callbacks profiling (only when CALLBACK_PROFILING=1)
+profiling.install(server)
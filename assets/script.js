@@ -1,59 +1,116 @@
 /**
- * Init app
+ * Client-side callbacks
+ * Presentational updates run on the browser, without requests to the server
  */
-document.addEventListener('DOMContentLoaded', function () {
-    const bodyElement = document.querySelector('body');
-
-    // Create an observer instance
-    const observer = new MutationObserver(function (mutations) {
-        mutations.forEach(function () {
-            domRefreshed();
-        });
-    });
-
-    // Start observation to the target
-    observer.observe(bodyElement, {
-        childList: true,
-        characterData: true,
-        subtree: true
-    });
-});
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    navigation: {
+        /**
+         * Add active class to the <li> elements that have the active href
+         * @param pathname Current path name
+         * @param paths Paths of the navigation links (same order as the outputs)
+         * @returns Class names
+         */
+        activeClass: function (pathname, paths) {
+            return paths.map((path) => path === pathname ? 'active' : '');
+        }
+    },
+    exactTimer: {
+        /**
+         * Restart the exact timer: the hidden exact timer button is clicked when there is no other response
+         * with approximate results during the delay (the exact results are computed once the user stops)
+         * @param pending Delay (milliseconds) and time of the response or null to cancel the timer
+         * @returns Time of the response that started the timer
+         */
+        restart: function (pending) {
+            clearTimeout(window.exactTimeout);
 
-/**
- * Executes every that React changes the DOM
- * All elements on the window are available
- */
-function domRefreshed() {
-    // Top companies modal button
-    const topCompaniesBtn = document.querySelector('#top-companies');
+            if (!pending) {
+                return null;
+            }
 
+            window.exactTimeout = setTimeout(() => {
+                document.getElementById('exact-timer').click();
+            }, pending.delay);
 
-    if (topCompaniesBtn !== null && !topCompaniesBtn.classList.contains('loaded-element')) {
-        // Add loaded-element class to prevent multiples instances
-        topCompaniesBtn.classList.add('loaded-element')
+            return pending.response;
+        }
+    },
+    topCompanies: {
+        /**
+         * Open the top 10 companies modal (it is initialized on the first click)
+         * @param clicks Number of clicks of the modal button
+         * @returns Number of times the modal was opened
+         */
+        openModal: function (clicks) {
+            if (!clicks) {
+                return window.dash_clientside.no_update;
+            }
 
-        // Init modals
-        M.Modal.init(document.querySelectorAll('.modal'));
+            const modalElement = document.querySelector('#modal1');
+            const modal = M.Modal.getInstance(modalElement) || M.Modal.init(modalElement, {
+                onOpenStart: () => {
+                    // All iframes that actually are used on top 10 companies modal
+                    modalElement.querySelectorAll('iframe').forEach((iframe) => {
+                        // Set fallback URL
+                        iframe.src = iframe.dataset.fallback;
+                    });
+                },
+                onOpenEnd: () => {
+                    // Init tabs every the modal opens (the tabs change with the filters)
+                    M.Tabs.init(modalElement.querySelectorAll('.tabs')).forEach((tab) => {
+                        tab.updateTabIndicator();
+                    });
+                }
+            });
 
-        // Listen when the modal is open
-        topCompaniesBtn.addEventListener('click', () => {
-            // All iframes that actually are used on top 10 companies modal
-            const iframes = document.querySelectorAll('iframe');
+            modal.open();
 
-            iframes.forEach((iframe) => {
-                // Set fallback URL
-                iframe.src = iframe.dataset.fallback;
-            });
+            return clicks;
+        }
+    },
+    download: {
+        /**
+         * Get the download URLs of the companies of the current selection (same inputs as the graphs)
+         * @param companyNames Selected company names
+         * @param industries Selected industries
+         * @param rangeEmployees Selected employees ranges
+         * @param stateNames Selected state names
+         * @param localities Selected localities
+         * @param mapEvent Selected points of the map
+         * @param leftChartEvent Selected point of the business foundation chart
+         * @param years Founded years slider range
+         * @param employees Employees slider range
+         * @param pathname Current path name (sector)
+         * @returns CSV and Parquet URLs
+         */
+        companiesUrls: function (companyNames, industries, rangeEmployees, stateNames, localities, mapEvent,
+                                 leftChartEvent, years, employees, pathname) {
+            const selection = {
+                company_names: companyNames,
+                industries: industries,
+                range_employees: rangeEmployees,
+                state_names: stateNames,
+                localities: localities,
+                years: years,
+                employees: employees,
+                state: null,
+                year: null,
+                industry: null
+            };
+            // Soft filters (see update_graphs)
+            if (mapEvent) {
+                mapEvent.points.forEach((point) => {
+                    selection.state = point.customdata;
+                });
+            }
+            if (leftChartEvent && leftChartEvent.points.length) {
+                selection.year = leftChartEvent.points[0].customdata[0];
+                selection.industry = leftChartEvent.points[0].customdata[1];
+            }
 
-            // Update tab indicator
-            window.setTimeout(() => {
-                // Init tabs every the modal opens
-                const tabs = M.Tabs.init(document.querySelectorAll('.tabs'));
+            const query = '?selection=' + encodeURIComponent(JSON.stringify(selection));
 
-                tabs.forEach((tab) => {
-                    tab.updateTabIndicator();
-                })
-            }, 500);
-        });
+            return ['csv', 'parquet'].map((format) => '/download' + pathname + '/companies.' + format + query);
+        }
     }
-}
\ No newline at end of file
+});
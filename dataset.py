@@ -0,0 +1,154 @@
+import contextlib
+import functools
+import os
+import threading
+import time
+
+"""
+Versioned datasets.
+A dataset handle keeps the active version of the data used by a page. A watcher checks the source file,
+builds the new version in the background when the file changes and then swaps the active version,
+so the requests never wait for the data to be loaded and never see a half built version.
+The watcher only runs in the process that started it: with a preloaded server the master reloads the data
+and the swap hooks recycle the workers, so the new workers share the new version (see serve.py).
+"""
+# Seconds between every check of the source file
+watch_interval = 30
+# Functions called with the handle after a new version is active (e.g. to recycle the server workers)
+swap_hooks = []
+
+
+class Dataset:
+    """
+    A version of the data. The attributes are the frames (or any other value) returned by the build function
+    """
+
+    def __init__(self, version, signature, values):
+        """
+        :param version: Version number
+        :param signature: Signature of the source file used to build the version
+        :param values: Dict with the values of the version (e.g. {'companies': data frame})
+        """
+        self.version = version
+        self.signature = signature
+        self.__dict__.update(values)
+
+
+class DatasetHandle:
+    """
+    Handle with the active dataset version
+    """
+
+    def __init__(self, source, build, warm=None):
+        """
+        :param source: Source file path
+        :param build: Function that receives the source path and returns a dict with the values of the version
+        :param warm: Function called with the new version before it is active (e.g. to prebuild figures)
+        """
+        self.source = source
+        self.build = build
+        self.warm = warm
+        self.active = None
+        self.build_lock = threading.Lock()
+        self.local = threading.local()
+
+    def signature(self):
+        """
+        Get the signature of the source file
+        :return: Tuple with the size and modification time or None when the file doesn't exist
+        """
+        try:
+            stat = os.stat(self.source)
+        except OSError:
+            return None
+
+        return stat.st_size, stat.st_mtime
+
+    def current(self):
+        """
+        Get the active version (or the pinned version), the first version is built on the first call
+        :return: Dataset
+        """
+        pinned = getattr(self.local, 'dataset', None)
+        if pinned is not None:
+            return pinned
+
+        active = self.active
+        if active is None:
+            self.reload()
+            active = self.active
+
+        return active
+
+    @contextlib.contextmanager
+    def pinned(self, dataset=None):
+        """
+        Pin a version for the current thread, so every function called inside uses the same version
+        :param dataset: Dataset to pin or None for the active version
+        :return: Context manager that yields the pinned dataset
+        """
+        previous = getattr(self.local, 'dataset', None)
+        self.local.dataset = dataset if dataset is not None else self.current()
+        try:
+            yield self.local.dataset
+        finally:
+            self.local.dataset = previous
+
+    def pin(self, function):
+        """
+        Decorator that pins the active version while the function runs (e.g. on callbacks)
+        :param function: Function to decorate
+        :return: Decorated function
+        """
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.pinned():
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    def reload(self):
+        """
+        Build a new version when the source file changed and swap the active version
+        :return: True when the active version was replaced
+        """
+        with self.build_lock:
+            signature = self.signature()
+            if self.active is not None and (signature is None or signature == self.active.signature):
+                return False
+
+            first = self.active is None
+            version = 1 if first else self.active.version + 1
+            dataset = Dataset(version, signature, self.build(self.source))
+
+            # Prepare the new version before it receives requests
+            if self.warm is not None:
+                with self.pinned(dataset):
+                    self.warm(dataset)
+
+            # Swap (a single reference assignment, the requests keep the version they already have)
+            self.active = dataset
+
+        # The first version is not a swap (nothing was served with other version)
+        if not first:
+            for hook in swap_hooks:
+                hook(self)
+
+        return True
+
+    def watch(self, interval=watch_interval):
+        """
+        Start a background thread that reloads the dataset when the source file changes
+        :param interval: Seconds between every check
+        :return: None
+        """
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload()
+                except Exception as error:
+                    # Keep the active version when the new file can't be loaded
+                    print('Dataset reload failed ({}): {}'.format(self.source, error))
+
+        threading.Thread(target=run, name='dataset-watcher', daemon=True).start()
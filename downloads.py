@@ -0,0 +1,98 @@
+import io
+import os
+import threading
+
+"""
+Companies downloads.
+The filtered companies are written chunk by chunk (CSV or Parquet, one row group by chunk) and every chunk is
+sent as soon as it is written, so only a chunk of the result is in memory. The downloads have a max number of
+rows and every process serves a limited number of downloads at the same time.
+"""
+# Formats by file extension (mime type)
+formats = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+# Companies filtered and written by chunk
+chunk_size = 50000
+# Max companies of a download
+max_rows = int(os.environ.get('DOWNLOAD_MAX_ROWS', '1000000'))
+# Downloads served at the same time by process
+slots = threading.BoundedSemaphore(int(os.environ.get('DOWNLOAD_CONCURRENCY', '2')))
+
+
+class StreamSink(io.RawIOBase):
+    """
+    Writable file that keeps the written bytes until they are taken (the Parquet writer needs the position)
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self):
+        """
+        Take the bytes written since the last call
+        :return: Bytes
+        """
+        data = b''.join(self.chunks)
+        self.chunks = []
+
+        return data
+
+
+def csv_stream(frames):
+    """
+    Write data frames as a CSV file
+    :param frames: Iterable with data frames (same columns)
+    :return: Generator with the CSV text of every data frame
+    """
+    header = True
+
+    for frame in frames:
+        if header or len(frame) > 0:
+            yield frame.to_csv(index=False, header=header)
+            header = False
+
+
+def parquet_stream(frames):
+    """
+    Write data frames as a Parquet file (pyarrow is only imported by the Parquet downloads)
+    :param frames: Iterable with data frames (same columns)
+    :return: Generator with the Parquet bytes written by every data frame
+    """
+    import pyarrow
+    import pyarrow.parquet
+
+    sink = StreamSink()
+    writer = None
+
+    for frame in frames:
+        # Text columns may have mixed values (e.g. numbers and text on the workbook)
+        text_columns = frame.columns[frame.dtypes == object]
+        frame = frame.astype({column: 'string' for column in text_columns})
+
+        if writer is None:
+            writer = pyarrow.parquet.ParquetWriter(sink, pyarrow.Schema.from_pandas(frame, preserve_index=False))
+        elif len(frame) == 0:
+            continue
+
+        writer.write_table(pyarrow.Table.from_pandas(frame, schema=writer.schema, preserve_index=False))
+        yield sink.take()
+
+    if writer is not None:
+        writer.close()
+        yield sink.take()
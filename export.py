@@ -0,0 +1,203 @@
+import argparse
+import html as html_escape
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+"""
+Static export.
+Prerender dashboard views (filter configurations) to static bundles: an HTML page that opens without the
+server and a JSON file with the figures. The states geometry and plotly.js are written once in the output
+directory and shared by all the bundles.
+
+Configurations file (JSON list):
+[
+    {"name": "texas-retail", "industries": ["Retail"], "state_names": ["Texas"]},
+    {"name": "big-companies", "range_employees": ["5001-10000", "10001+"]}
+]
+Every configuration accepts the sector name (default food-and-beverages), the dropdowns values: company_names,
+industries, range_employees (labels), state_names and localities, and the sliders values: years (first and last
+founded year) and employees (first and last step of the employees slider). A missing value means all.
+"""
+dirname = os.path.dirname(os.path.abspath(__file__))
+# Shared files of the bundles
+states_script_name = 'states.js'
+states_json_name = 'states.json'
+plotly_script_name = 'plotly.min.js'
+# Page of every bundle
+page_template = '''<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="utf-8">
+    <title>{title}</title>
+    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/materialize/1.0.0/css/materialize.min.css">
+    <script src="../{plotly_script}"></script>
+    <script src="../{states_script}"></script>
+</head>
+<body>
+<div class="container">
+    <h4>{title}</h4>
+    <div id="map"></div>
+    <div class="row">
+        <div class="col s8"><div id="left-chart"></div></div>
+        <div class="col s4"><div id="right-chart"></div></div>
+    </div>
+    <h5>{modal_title}</h5>
+    {top_10}
+</div>
+<script>
+    const figures = {figures};
+
+    Object.keys(figures).forEach((id) => {{
+        // The states geometry is shared by all the bundles
+        figures[id].data.forEach((trace) => {{
+            if (trace.type === 'choroplethmapbox') {{
+                trace.geojson = window.usStates;
+            }}
+        }});
+        Plotly.newPlot(id, figures[id].data, figures[id].layout);
+    }});
+</script>
+</body>
+</html>
+'''
+
+
+def component_html(component):
+    """
+    Render a Dash HTML component (and its children) as HTML
+    :param component: Dash component, string, number or list
+    :return: HTML string
+    """
+    if component is None:
+        return ''
+    if isinstance(component, (list, tuple)):
+        return ''.join(component_html(child) for child in component)
+    if not hasattr(component, 'to_plotly_json'):
+        return html_escape.escape(str(component))
+
+    properties = component.to_plotly_json()['props']
+    tag = component._type.lower()
+    attributes = []
+
+    for name, value in properties.items():
+        if name == 'children':
+            continue
+        if name == 'className':
+            name = 'class'
+        elif name == 'style':
+            value = ';'.join('{}:{}'.format(key, style) for key, style in value.items())
+        attributes.append(' {}="{}"'.format(name, html_escape.escape(str(value))))
+
+    return '<{0}{1}>{2}</{0}>'.format(tag, ''.join(attributes), component_html(properties.get('children')))
+
+
+def figure_json(figure):
+    """
+    Convert a figure to JSON without the shared states geometry
+    :param figure: Plotly figure
+    :return: Dict
+    """
+    figure = json.loads(figure.to_json())
+
+    for trace in figure['data']:
+        if trace.get('type') == 'choroplethmapbox':
+            trace.pop('geojson', None)
+
+    # The density tiles are served by the dashboard server, the bundles don't have server
+    figure['layout'].get('mapbox', {}).pop('layers', None)
+
+    return figure
+
+
+def export_bundle(configuration, output):
+    """
+    Render a configuration and write its bundle (runs on the workers)
+    :param configuration: Dict with the configuration (see module docstring)
+    :param output: Output directory
+    :return: Bundle name
+    """
+    from pages import sector as page
+
+    name = configuration['name']
+    with page.sector_context(page.sectors['/' + configuration.get('sector', 'food-and-beverages')]):
+        company_names, industries, employees_ranges, state_names, localities, year_range = page.selected_filters(
+            configuration.get('company_names'), configuration.get('industries'),
+            configuration.get('range_employees'), configuration.get('state_names'), configuration.get('localities'),
+            configuration.get('years'), configuration.get('employees'))
+
+        figures = {
+            'map': figure_json(page.companies_states_map(company_names, industries, employees_ranges, state_names,
+                                                         localities, None, None, year_range)),
+            'left-chart': figure_json(page.business_foundation_chart(employees_ranges, state_names, localities,
+                                                                     None, None, year_range)),
+            'right-chart': figure_json(page.biggest_companies_chart(industries, employees_ranges, state_names,
+                                                                    localities, None, year_range)),
+        }
+        top_10 = page.top_10_companies_tabs(industries, employees_ranges, state_names, localities, None, year_range)
+
+    modal_title = 'Top 10 companies {}'.format(', '.join(industries) if industries is not None else 'All')
+    bundle = os.path.join(output, name)
+    os.makedirs(bundle, exist_ok=True)
+
+    with open(os.path.join(bundle, 'figures.json'), 'w') as figures_file:
+        json.dump({'configuration': configuration, 'figures': figures, 'geojson': '../' + states_json_name},
+                  figures_file)
+    with open(os.path.join(bundle, 'index.html'), 'w') as page_file:
+        page_file.write(page_template.format(
+            title=html_escape.escape(configuration.get('title', name)),
+            modal_title=html_escape.escape(modal_title),
+            top_10=component_html(top_10),
+            figures=json.dumps(figures).replace('</', '<\\/'),
+            plotly_script=plotly_script_name,
+            states_script=states_script_name,
+        ))
+
+    return name
+
+
+def export(configurations, output, jobs):
+    """
+    Export the bundles of the configurations in parallel
+    :param configurations: List of configurations
+    :param output: Output directory
+    :param jobs: Number of processes
+    :return: List with the bundle names
+    """
+    from plotly.offline import get_plotlyjs
+    # Register the sectors
+    import pages
+    from pages import sector as page
+
+    os.makedirs(output, exist_ok=True)
+
+    # Shared files
+    with open(os.path.join(output, states_json_name), 'w') as states_file:
+        json.dump(page.states, states_file)
+    with open(os.path.join(output, states_script_name), 'w') as states_file:
+        states_file.write('window.usStates = {};'.format(json.dumps(page.states)))
+    with open(os.path.join(output, plotly_script_name), 'w') as plotly_file:
+        plotly_file.write(get_plotlyjs())
+
+    # The data of the sectors is loaded (on register) before the workers are created, so the workers share it
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(export_bundle, configurations, [output] * len(configurations)))
+
+
+# Export the bundles from the command line (e.g. python export.py views.json --output exports)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Prerender dashboard views to static bundles')
+    parser.add_argument('configurations', nargs='?', help='JSON file with the configurations (default: all data)')
+    parser.add_argument('--output', default='exports', help='output directory')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='number of processes')
+    arguments = parser.parse_args()
+
+    views = [{'name': 'all', 'title': 'Food and beverages'}]
+    if arguments.configurations is not None:
+        with open(arguments.configurations) as configurations_file:
+            views = json.load(configurations_file)
+
+    sys.path.insert(0, dirname)
+    for bundle_name in export(views, arguments.output, arguments.jobs):
+        print('Exported {}'.format(os.path.join(arguments.output, bundle_name, 'index.html')))
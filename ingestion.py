@@ -0,0 +1,320 @@
+import contextlib
+import csv
+import hashlib
+import json
+import os
+import shutil
+import sys
+import pandas as pd
+from openpyxl import load_workbook
+
+try:
+    import fcntl
+except ImportError:
+    # Only POSIX systems have file locks (the production server), the caches aren't locked on other systems
+    fcntl = None
+
+"""
+Companies ingestion.
+The source file (Excel or CSV) is read in chunks, every chunk is validated and coerced, and the valid rows
+are written to an on-disk cache. The rows that can't be coerced are written to a quarantine report.
+The cache is read by the dashboard instead of the source file while the source file doesn't change.
+A lock file serializes the ingestion of a source between processes: the cache is read with a shared lock and
+written with an exclusive lock, so a process never reads or removes a cache that other process is writing.
+"""
+dirname = os.path.dirname(__file__)
+# Cache directory (out of the assets folder, the assets are public)
+cache_dirname = os.path.join(dirname, 'cache')
+# Rows by chunk
+chunk_size = 20000
+# Cache format, the caches of other formats are built again (e.g. new coerced columns)
+cache_format = 3
+# Cache file names
+manifest_name = 'manifest.json'
+quarantine_name = 'quarantine.csv'
+# Columns validated on every chunk
+year_column = 'Year founded'
+employees_column = 'Current employee estimate'
+state_column = 'State'
+# Optional locality coordinates columns (column and valid range)
+coordinate_columns = (('Locality latitude', 90), ('Locality longitude', 180))
+
+
+def cache_path(source):
+    """
+    Get the cache directory of a source file (e.g. cache/food-and-beverage.xlsx-1f3a9c0e52b7).
+    The directory is keyed by the absolute path, the sources with the same file name have their own cache
+    :param source: Source file path
+    :return: Cache directory path
+    """
+    path_hash = hashlib.sha1(os.path.abspath(source).encode()).hexdigest()[:12]
+
+    return os.path.join(cache_dirname, '{}-{}'.format(os.path.basename(source), path_hash))
+
+
+@contextlib.contextmanager
+def cache_lock(source, exclusive):
+    """
+    Lock the cache of a source file between processes (the lock is released when the context ends).
+    Without file locks (non POSIX systems) the cache isn't locked
+    :param source: Source file path
+    :param exclusive: True to write the cache, False to read it
+    :return: Context manager
+    """
+    if fcntl is None:
+        yield
+        return
+
+    os.makedirs(cache_dirname, exist_ok=True)
+    with open(cache_path(source) + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+def source_signature(source):
+    """
+    Get the signature used to know if the cache is outdated
+    :param source: Source file path
+    :return: Dict with the size and modification time of the source file
+    """
+    stat = os.stat(source)
+
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def read_chunks(source, size=chunk_size):
+    """
+    Read the source file in chunks, without loading the whole file in memory (the empty rows are skipped)
+    :param source: Excel (.xlsx) or CSV file path
+    :param size: Rows by chunk
+    :return: Generator of data frames indexed by the row number on the source file (the header is the row 1)
+    """
+    if source.lower().endswith('.csv'):
+        # The empty rows are read (and dropped) so the index counts them
+        for chunk in pd.read_csv(source, chunksize=size, dtype=str, keep_default_na=False, skip_blank_lines=False):
+            chunk.index += 2
+            yield chunk[(chunk != '').any(axis=1)]
+        return
+
+    # Read only mode streams the rows from the workbook
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(column) for column in next(rows, ())]
+        chunk = []
+        row_numbers = []
+
+        for row_number, row in enumerate(rows, 2):
+            # Skip empty rows
+            if all(value is None for value in row):
+                continue
+
+            chunk.append(row)
+            row_numbers.append(row_number)
+            if len(chunk) == size:
+                yield pd.DataFrame(chunk, columns=header, index=row_numbers)
+                chunk = []
+                row_numbers = []
+
+        if len(chunk) > 0:
+            yield pd.DataFrame(chunk, columns=header, index=row_numbers)
+    finally:
+        workbook.close()
+
+
+def validate_chunk(chunk, state_codes):
+    """
+    Validate and coerce a chunk of companies
+    :param chunk: Companies data frame
+    :param state_codes: Set with the valid state codes
+    :return: Tuple with the valid rows and the quarantined rows (with the reason)
+    """
+    reasons = pd.Series('', index=chunk.index)
+
+    # Years: missing values are set to 0 (unknown year)
+    years = chunk[year_column]
+    years = pd.to_numeric(years.where(years.notna(), 0).replace({'missing': 0, '': 0}), errors='coerce')
+    reasons[years.isna() | (years < 0) | (years % 1 != 0)] += 'invalid year; '
+
+    # Current employee estimate must be a positive integer
+    employees = pd.to_numeric(chunk[employees_column], errors='coerce')
+    reasons[employees.isna() | (employees < 0) | (employees % 1 != 0)] += 'invalid employee estimate; '
+
+    # State codes must exist on the locations file
+    states = chunk[state_column].astype(str).str.strip().str.upper()
+    reasons[~states.isin(state_codes)] += 'unknown state; '
+
+    # Locality coordinates (optional): missing values are the coordinates of the state (see companies_coordinates)
+    coordinates = {}
+    for coordinate_column, bound in coordinate_columns:
+        if coordinate_column not in chunk.columns:
+            continue
+
+        values = chunk[coordinate_column]
+        values = values.where(values.notna() & (values.astype(str).str.strip() != ''))
+        coordinates[coordinate_column] = pd.to_numeric(values, errors='coerce')
+        reasons[(values.notna() & coordinates[coordinate_column].isna()) |
+                (coordinates[coordinate_column].abs() > bound)] += 'invalid {}; '.format(coordinate_column.lower())
+
+    valid = reasons == ''
+    valid_rows = chunk[valid].copy()
+    valid_rows[year_column] = years[valid].astype('int64')
+    valid_rows[employees_column] = employees[valid].astype('int64')
+    valid_rows[state_column] = states[valid]
+    for coordinate_column, values in coordinates.items():
+        valid_rows[coordinate_column] = values[valid].astype('float64')
+
+    quarantined_rows = chunk[~valid].copy()
+    quarantined_rows['Reason'] = reasons[~valid].str.rstrip('; ')
+
+    return valid_rows, quarantined_rows
+
+
+def ingest(source, state_codes, columns=None, size=chunk_size):
+    """
+    Stream the source file to the cache, chunk by chunk (the other processes wait until the cache is written)
+    :param source: Source file path
+    :param state_codes: Set with the valid state codes
+    :param columns: Dict to rename the source columns (see write_cache)
+    :param size: Rows by chunk
+    :return: Dict with the ingestion summary (the manifest)
+    """
+    with cache_lock(source, exclusive=True):
+        return write_cache(source, state_codes, columns, size)
+
+
+def write_cache(source, state_codes, columns=None, size=chunk_size):
+    """
+    Stream the source file to the cache, chunk by chunk (the exclusive cache lock must be held).
+    The cache is written to a temporary directory and moved at the end, so a failed ingestion never
+    replaces a valid cache
+    :param source: Source file path
+    :param state_codes: Set with the valid state codes
+    :param columns: Dict to rename the source columns to the company columns or None when the source
+                    already uses the company columns (e.g. {'Employees': 'Current employee estimate'})
+    :param size: Rows by chunk
+    :return: Dict with the ingestion summary (the manifest)
+    """
+    target = cache_path(source)
+    # Temporary directory of the process (a previous ingestion of the process may have failed)
+    temporary = '{}.tmp-{}'.format(target, os.getpid())
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+
+    signature = source_signature(source)
+    parts = []
+    rows = 0
+    quarantined = 0
+
+    with open(os.path.join(temporary, quarantine_name), 'w', newline='') as quarantine_file:
+        quarantine_writer = None
+
+        for index, chunk in enumerate(read_chunks(source, size)):
+            valid_rows, quarantined_rows = validate_chunk(chunk.rename(columns=columns or {}), state_codes)
+
+            # Write valid rows
+            part = 'part-{:05d}.pkl'.format(index)
+            valid_rows.reset_index(drop=True).to_pickle(os.path.join(temporary, part))
+            parts.append(part)
+            rows += len(valid_rows)
+
+            # Write quarantine report
+            if len(quarantined_rows) > 0:
+                if quarantine_writer is None:
+                    quarantine_writer = csv.writer(quarantine_file)
+                    quarantine_writer.writerow(['Row'] + list(quarantined_rows.columns))
+                # Row number on the source file (the index of the chunk)
+                for row_number, row in zip(quarantined_rows.index, quarantined_rows.itertuples(index=False)):
+                    quarantine_writer.writerow([row_number] + list(row))
+                quarantined += len(quarantined_rows)
+
+    manifest = {
+        'format': cache_format,
+        'source': os.path.basename(source),
+        'signature': signature,
+        'columns': columns or {},
+        'parts': parts,
+        'rows': rows,
+        'quarantined': quarantined,
+    }
+    with open(os.path.join(temporary, manifest_name), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+
+    # Replace the previous cache (nobody reads it, the lock is exclusive)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(temporary, target)
+
+    return manifest
+
+
+def read_manifest(source, columns=None):
+    """
+    Read the cache manifest of a source file
+    :param source: Source file path
+    :param columns: Dict to rename the source columns (see ingest)
+    :return: Manifest dict or None when there is no cache or it is outdated
+    """
+    try:
+        with open(os.path.join(cache_path(source), manifest_name)) as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get('format') != cache_format or manifest.get('signature') != source_signature(source) or \
+            manifest.get('columns', {}) != (columns or {}):
+        return None
+
+    return manifest
+
+
+def load_companies(source, state_codes, columns=None):
+    """
+    Load the companies from the cache, the cache is built first when it doesn't exist or it is outdated
+    :param source: Source file path
+    :param state_codes: Set with the valid state codes
+    :param columns: Dict to rename the source columns (see ingest)
+    :return: Companies data frame
+    """
+    with cache_lock(source, exclusive=False):
+        manifest = read_manifest(source, columns)
+        if manifest is not None:
+            return read_cache(source, manifest)
+
+    # Only one process builds the cache, the others wait and read the cache it wrote
+    with cache_lock(source, exclusive=True):
+        manifest = read_manifest(source, columns)
+        if manifest is None:
+            manifest = write_cache(source, state_codes, columns)
+
+        return read_cache(source, manifest)
+
+
+def read_cache(source, manifest):
+    """
+    Read the companies of the cache (a cache lock must be held)
+    :param source: Source file path
+    :param manifest: Cache manifest
+    :return: Companies data frame
+    """
+    parts = [pd.read_pickle(os.path.join(cache_path(source), part)) for part in manifest['parts']]
+
+    return pd.concat(parts, ignore_index=True) if len(parts) > 0 else pd.DataFrame()
+
+
+def load_state_codes():
+    """
+    Read the valid state codes from the locations file
+    :return: Set with the state codes
+    """
+    locations = pd.read_excel(os.path.join(dirname, 'assets/long-and-lat-by-state.xlsx'), dtype={'Fip': str})
+
+    return set(locations['Code'].dropna().astype(str).str.upper())
+
+
+# Rebuild the cache from the command line (e.g. python ingestion.py assets/food-and-beverage.xlsx)
+if __name__ == '__main__':
+    for source_file in sys.argv[1:]:
+        summary = ingest(source_file, load_state_codes())
+        print('{}: {} rows, {} quarantined (see {})'.format(
+            source_file, summary['rows'], summary['quarantined'],
+            os.path.join(cache_path(source_file), quarantine_name)))
@@ -0,0 +1,367 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+"""
+Load test.
+Virtual users replay the interactions of an analyst (open the page, type a company name, change the dropdowns,
+drag the sliders, click the map bubbles and the chart points, browse the companies table) as Dash callback
+requests.
+The requests are sent to the WSGI application in-process or to a running server, and the report shows the
+throughput, latency percentiles and errors by callback.
+"""
+# Callbacks of the dashboard: outputs, inputs and states (component id, property)
+callbacks = {
+    'display_page': (
+        (('page-content', 'children'),),
+        (('url', 'pathname'),),
+        (),
+    ),
+    'update_company_names_dropdown': (
+        (('company_names_dropdown', 'options'), ('company_names_dropdown', 'value')),
+        (('company_name_input', 'value'),),
+        (('url', 'pathname'),),
+    ),
+    'update_graphs': (
+        (('left-chart', 'figure'), ('right-chart', 'figure'), ('map', 'figure'), ('top-10-companies', 'children'),
+         ('modal-title', 'children'), ('industries_dropdown', 'options'), ('range_employees_dropdown', 'options'),
+         ('states_dropdown', 'options'), ('localities_dropdown', 'options'), ('exact-pending', 'data')),
+        (('company_names_dropdown', 'value'), ('industries_dropdown', 'value'), ('range_employees_dropdown', 'value'),
+         ('states_dropdown', 'value'), ('localities_dropdown', 'value'), ('map', 'selectedData'),
+         ('left-chart', 'selectedData'), ('years_slider', 'value'), ('employees_slider', 'value'),
+         ('exact-timer', 'n_clicks')),
+        (('url', 'pathname'),),
+    ),
+    'update_companies_table': (
+        (('companies-table', 'data'), ('companies-table', 'page_count'), ('companies-table', 'page_current')),
+        (('companies-table', 'page_current'), ('companies-table', 'page_size'), ('companies-table', 'sort_by'),
+         ('companies-table', 'filter_query'), ('company_names_dropdown', 'value'), ('industries_dropdown', 'value'),
+         ('range_employees_dropdown', 'value'), ('states_dropdown', 'value'), ('localities_dropdown', 'value'),
+         ('years_slider', 'value'), ('employees_slider', 'value')),
+        (('url', 'pathname'),),
+    ),
+}
+# Dropdowns used by the update_graphs and update_companies_table callbacks
+dropdowns = ('company_names_dropdown', 'industries_dropdown', 'range_employees_dropdown', 'states_dropdown',
+             'localities_dropdown')
+
+
+def callback_payload(name, values, changed):
+    """
+    Create the body of a Dash callback request
+    :param name: Callback name (see callbacks)
+    :param values: Dict with the input values by (component id, property)
+    :param changed: Input (component id, property) that triggered the callback
+    :return: Dict with the request body
+    """
+    outputs, inputs, states = callbacks[name]
+    output = '..' + '...'.join('{}.{}'.format(*item) for item in outputs) + '..'
+    if len(outputs) == 1:
+        output = '{}.{}'.format(*outputs[0])
+
+    return {
+        'output': output,
+        'outputs': [{'id': item[0], 'property': item[1]} for item in outputs]
+        if len(outputs) > 1 else {'id': outputs[0][0], 'property': outputs[0][1]},
+        'inputs': [{'id': item[0], 'property': item[1], 'value': values.get(item)} for item in inputs],
+        'changedPropIds': ['{}.{}'.format(*changed)],
+        'state': [{'id': item[0], 'property': item[1], 'value': values.get(item)} for item in states],
+    }
+
+
+class InProcessClient:
+    """
+    Send the requests to the WSGI application (one Flask test client by thread)
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.local = threading.local()
+
+    def post(self, path, body):
+        """
+        :param path: Request path
+        :param body: JSON body
+        :return: Tuple with the status code and the JSON response (None when it is not JSON)
+        """
+        if not hasattr(self.local, 'client'):
+            self.local.client = self.application.test_client()
+
+        response = self.local.client.post(path, json=body)
+
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpClient:
+    """
+    Send the requests to a running server
+    """
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+
+    def post(self, path, body):
+        """
+        :param path: Request path
+        :param body: JSON body
+        :return: Tuple with the status code and the JSON response (None when it is not JSON)
+        """
+        request = urllib.request.Request(self.url + path, data=json.dumps(body).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                return response.status, json.load(response)
+        except urllib.error.HTTPError as error:
+            return error.code, None
+
+
+class Report:
+    """
+    Latencies and errors by callback
+    """
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.elapsed = 0
+        self.lock = threading.Lock()
+
+    def add(self, name, latency, error):
+        with self.lock:
+            self.latencies.setdefault(name, []).append(latency)
+            self.errors[name] = self.errors.get(name, 0) + (1 if error else 0)
+
+    def totals(self):
+        """
+        Get the totals of all the callbacks
+        :return: Dict with requests, throughput, p50/p95/p99 latencies (seconds) and error rate
+        """
+        latencies = sorted(latency for values in self.latencies.values() for latency in values)
+        requests = len(latencies)
+
+        return {
+            'requests': requests,
+            'throughput': requests / self.elapsed if self.elapsed > 0 else 0,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'errors': sum(self.errors.values()) / requests if requests > 0 else 0,
+        }
+
+    def format(self):
+        """
+        Format the report
+        :return: Report text
+        """
+        elapsed = self.elapsed
+        lines = ['{:<30} {:>8} {:>9} {:>9} {:>9} {:>9} {:>8}'.format(
+            'Callback', 'Requests', 'Req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'Errors')]
+        total = 0
+
+        for name in sorted(self.latencies):
+            latencies = sorted(self.latencies[name])
+            total += len(latencies)
+            lines.append('{:<30} {:>8} {:>9.1f} {:>9.1f} {:>9.1f} {:>9.1f} {:>7.1f}%'.format(
+                name, len(latencies), len(latencies) / elapsed,
+                percentile(latencies, 50) * 1000, percentile(latencies, 95) * 1000,
+                percentile(latencies, 99) * 1000, self.errors[name] / len(latencies) * 100))
+
+        lines.append('Total: {} requests in {:.1f}s ({:.1f} req/s)'.format(total, elapsed, total / elapsed))
+
+        return '\n'.join(lines)
+
+
+def percentile(values, percent):
+    """
+    Get the percentile of sorted values (nearest rank)
+    :param values: Sorted values
+    :param percent: Percentile (0-100)
+    :return: Value
+    """
+    if len(values) == 0:
+        return 0
+
+    return values[min(len(values) - 1, max(0, int(round(percent / 100 * len(values))) - 1))]
+
+
+class VirtualUser:
+    """
+    An analyst using the food and beverages page
+    """
+
+    def __init__(self, client, report, seed, path):
+        self.client = client
+        self.path = path
+        self.report = report
+        self.random = random.Random(seed)
+        self.values = {}
+        self.options = {}
+        self.map_points = []
+        self.chart_points = []
+
+    def call(self, name, changed, value):
+        """
+        Set an input value and send the callback request
+        :param name: Callback name
+        :param changed: Input (component id, property) changed
+        :param value: New value
+        :return: Response or None
+        """
+        self.values[changed] = value
+        start = time.perf_counter()
+        try:
+            status, response = self.client.post('/_dash-update-component',
+                                                callback_payload(name, self.values, changed))
+        except Exception:
+            status, response = None, None
+        self.report.add(name, time.perf_counter() - start, status != 200)
+
+        return response['response'] if status == 200 and response is not None else None
+
+    def update_graphs(self, changed, value):
+        response = self.call('update_graphs', changed, value)
+        self.call('update_companies_table', changed, value)
+
+        # Approximate results (sectors with sample), the exact timer fires on the browser
+        if response is not None and response.get('exact-pending', {}).get('data') is not None:
+            clicks = self.values.get(('exact-timer', 'n_clicks')) or 0
+            response = self.call('update_graphs', ('exact-timer', 'n_clicks'), clicks + 1) or response
+
+        if response is None:
+            return
+
+        # Keep the options and the points, the next interactions use them
+        for dropdown in dropdowns[1:]:
+            if dropdown in response:
+                self.options[dropdown] = [option['value'] for option in response[dropdown]['options']]
+        map_data = response['map']['figure']['data']
+        self.map_points = list(enumerate(map_data[-1].get('customdata', []))) if len(map_data) > 0 else []
+        self.chart_points = [
+            point for trace in response['left-chart']['figure']['data'] for point in trace.get('customdata', [])
+        ]
+
+    def type_company_name(self):
+        word = self.random.choice(['company 1', 'company 2', 'company 3'])
+        for length in range(1, len(word) + 1):
+            self.call('update_company_names_dropdown', ('company_name_input', 'value'), word[:length])
+
+    def change_dropdown(self):
+        dropdown = self.random.choice(dropdowns[1:])
+        options = self.options.get(dropdown, [])
+        value = self.random.sample(options, min(len(options), self.random.randint(0, 2))) or None
+        self.update_graphs((dropdown, 'value'), value)
+
+    def click_map(self):
+        if len(self.map_points) > 0:
+            number, state = self.random.choice(self.map_points)
+            self.update_graphs(('map', 'selectedData'), {'points': [{'pointNumber': number, 'customdata': state}]})
+
+    def click_chart(self):
+        if len(self.chart_points) > 0:
+            point = self.random.choice(self.chart_points)
+            self.update_graphs(('left-chart', 'selectedData'), {'points': [{'x': point[0], 'customdata': point}]})
+
+    def drag_slider(self):
+        # The slider sends a request by step while it is dragged
+        if self.random.random() < 0.5:
+            first = self.random.randint(1950, 2015)
+            for last in range(first, min(first + 10, 2020) + 1):
+                self.update_graphs(('years_slider', 'value'), [first, last])
+        else:
+            first = self.random.randint(0, 6)
+            for last in range(first + 1, 14):
+                self.update_graphs(('employees_slider', 'value'), [first, last])
+
+    def clear_selections(self):
+        self.values[('map', 'selectedData')] = None
+        self.update_graphs(('left-chart', 'selectedData'), None)
+
+    def browse_table(self):
+        for page in range(self.random.randint(1, 3)):
+            self.call('update_companies_table', ('companies-table', 'page_current'), page)
+
+    def run(self, stop_at):
+        """
+        Replay sessions until the end of the test
+        :param stop_at: End time (perf counter)
+        :return: None
+        """
+        self.values.update({
+            ('companies-table', 'page_current'): 0,
+            ('companies-table', 'page_size'): 20,
+            ('companies-table', 'sort_by'): [],
+            ('companies-table', 'filter_query'): '',
+        })
+        self.call('display_page', ('url', 'pathname'), self.path)
+        self.update_graphs(('industries_dropdown', 'value'), None)
+
+        actions = (self.type_company_name, self.change_dropdown, self.change_dropdown, self.click_map,
+                   self.click_chart, self.drag_slider, self.clear_selections, self.browse_table)
+        while time.perf_counter() < stop_at:
+            self.random.choice(actions)()
+
+
+def run(client, concurrency, duration, seed=0, path='/food-and-beverages'):
+    """
+    Run the virtual users
+    :param client: In-process or HTTP client
+    :param concurrency: Number of virtual users
+    :param duration: Seconds of the test
+    :param seed: Random seed
+    :param path: Path of the sector page
+    :return: Report
+    """
+    report = Report()
+    start = time.perf_counter()
+    users = [VirtualUser(client, report, seed + number, path) for number in range(concurrency)]
+    threads = [threading.Thread(target=user.run, args=(start + duration,)) for user in users]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    report.elapsed = time.perf_counter() - start
+
+    return report
+
+
+# Run the load test from the command line (e.g. python loadtest.py --synthetic 100000 --concurrency 8)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test of the dashboard callbacks')
+    parser.add_argument('--url', help='server URL (e.g. http://localhost:8050), by default the WSGI application '
+                                      'is loaded in-process')
+    parser.add_argument('--synthetic', type=int, metavar='ROWS',
+                        help='run the in-process application with a synthetic dataset (offline)')
+    parser.add_argument('--concurrency', type=int, default=4, help='number of virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of the test')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    parser.add_argument('--path', default='/food-and-beverages', help='path of the sector page')
+    arguments = parser.parse_args()
+
+    if arguments.url is not None:
+        test_client = HttpClient(arguments.url)
+    else:
+        if arguments.synthetic is not None:
+            import synthetic
+
+            # The environment variables must be set before the pages are imported
+            directory = tempfile.mkdtemp(prefix='iota-loadtest-')
+            os.environ['FOOD_AND_BEVERAGES_SOURCE'] = os.path.join(directory, 'companies.csv')
+            os.environ['US_STATES_GEOJSON'] = os.path.join(directory, 'us-states.json')
+            synthetic.generate_companies(os.environ['FOOD_AND_BEVERAGES_SOURCE'], arguments.synthetic, arguments.seed)
+            synthetic.generate_geojson(os.environ['US_STATES_GEOJSON'])
+
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from wsgi import application
+
+        test_client = InProcessClient(application)
+
+    print(run(test_client, arguments.concurrency, arguments.duration, arguments.seed, arguments.path).format())
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+"""
+States lookup table.
+The states are stored once in arrays indexed by an integer id, the companies only store the state id,
+so getting the coordinates, fip codes or names of the companies states is a numpy take.
+"""
+
+
+class StateTable:
+    """
+    Integer indexed table with the states information (code, fip, coordinates and names)
+    """
+
+    def __init__(self, locations):
+        """
+        :param locations: Locations data frame (State, Latitude, Longitud, Code, Fip, Name_stateuniversity)
+        """
+        locations = locations.dropna(subset=['Code']).drop_duplicates(subset=['Code']).reset_index(drop=True)
+
+        self.code = locations['Code'].astype(str).str.upper().to_numpy()
+        # Mapbox requires that the fip code always have two digits then add leading zeros
+        self.fip = locations['Fip'].astype(str).str.zfill(2).to_numpy()
+        self.latitude = locations['Latitude'].to_numpy(dtype=float)
+        self.longitude = locations['Longitud'].to_numpy(dtype=float)
+        # Label used on the map (e.g. Texas, the USA)
+        self.label = locations['State'].astype(str).to_numpy()
+        # Name used on the filters (e.g. Texas)
+        self.name = locations['Name_stateuniversity'].astype(str).to_numpy()
+
+        self.code_index = pd.Index(self.code)
+        self.name_index = pd.Index(self.name)
+
+    def __len__(self):
+        return len(self.code)
+
+    def ids(self, codes):
+        """
+        Get the state ids of the state codes
+        :param codes: Iterable with state codes (e.g. TX)
+        :return: Array with the state ids (-1 for unknown codes)
+        """
+        # Look up every distinct code once (the companies have a few distinct codes)
+        positions, distinct_codes = pd.factorize(pd.Series(codes, dtype=object))
+        ids = self.code_index.get_indexer(pd.Index(distinct_codes).astype(str).str.upper())
+
+        return np.where(positions >= 0, ids.take(positions), -1)
+
+    def ids_by_name(self, names):
+        """
+        Get the state ids of the state names
+        :param names: Iterable with state names (e.g. Texas)
+        :return: Array with the state ids of the known names
+        """
+        ids = self.name_index.get_indexer(list(names))
+
+        return ids[ids >= 0]
+
+    def mask(self, state_ids, selected_ids):
+        """
+        Create a mask with the rows of the selected states (a lookup instead of hashing every row)
+        :param state_ids: Array with the state id of every row
+        :param selected_ids: Iterable with the selected state ids
+        :return: Boolean array
+        """
+        selected = np.zeros(len(self), dtype=bool)
+        selected[np.asarray(selected_ids, dtype=np.int64)] = True
+
+        return selected.take(state_ids)
+
+    def codes(self):
+        """
+        Get the valid state codes
+        :return: Set with the state codes
+        """
+        return set(self.code)
+
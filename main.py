@@ -1,3 +1,5 @@
+# First import, the startup timings start here (see startup.py)
+import startup
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
@@ -8,6 +10,8 @@ from app import app, server
 app.layout = html.Div(className='container', children=[
     # URL bar
     dcc.Location(id='url', refresh=False),
+    # Paths of the navigation links (used by the active class client-side callback)
+    dcc.Store(id='navigation-paths', data=['/'] + list(pages.sector.sectors)),
     # Navigation page
     html.Nav(className='blue darken-4', children=[
         html.Div(className='nav-wrapper', children=[
@@ -20,9 +24,12 @@ app.layout = html.Div(className='container', children=[
                 html.Li(id='home', children=[
                     dcc.Link('Home', href='/'),
                 ]),
-                html.Li(id='food-and-beverages', children=[
-                    dcc.Link('Food and beverages', href='/food-and-beverages'),
-                ]),
+            ] + [
+                # One link by registered sector
+                html.Li(id=sector.name, children=[
+                    dcc.Link(sector.title, href=sector.path),
+                ])
+                for sector in pages.sector.sectors.values()
             ]),
         ]),
     ]),
@@ -37,28 +44,14 @@ app.layout = html.Div(className='container', children=[
 ])
 
 
-@app.callback(
-    [
-        dash.dependencies.Output('home', 'className'),
-        dash.dependencies.Output('food-and-beverages', 'className')
-    ],
-    [dash.dependencies.Input('url', 'pathname')]
+# Add active class to the <li> element that has active href (runs on the browser, see assets/script.js)
+app.clientside_callback(
+    dash.dependencies.ClientsideFunction(namespace='navigation', function_name='activeClass'),
+    [dash.dependencies.Output('home', 'className')] +
+    [dash.dependencies.Output(sector.name, 'className') for sector in pages.sector.sectors.values()],
+    [dash.dependencies.Input('url', 'pathname')],
+    [dash.dependencies.State('navigation-paths', 'data')]
 )
-def add_active_class(pathname: object) -> object:
-    """
-    Add active class to the <li> element that has active href
-    :param pathname: current path name
-    :return: class names
-    """
-    home = ''
-    food_and_beverages = ''
-
-    if pathname == '/':
-        home = 'active'
-    if pathname == '/food-and-beverages':
-        food_and_beverages = 'active'
-
-    return home, food_and_beverages
 
 
 # Update current page
@@ -67,12 +60,16 @@ def add_active_class(pathname: object) -> object:
     [dash.dependencies.Input('url', 'pathname')]
 )
 def display_page(pathname):
-    if pathname == '/food-and-beverages':
-        return pages.food_and_beverages.page
+    if pathname in pages.sector.sectors:
+        return pages.sector.sectors[pathname].page()
     if pathname == '/':
         return pages.index.page
 
 
+# The application is ready (the phases of the dataset reloads are not recorded)
+startup.finish()
+
+
 # Star app running
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -1,3 +1,3 @@
-from . import index, food_and_beverages
+from . import index, sector, food_and_beverages
 
-__all__ = [index, food_and_beverages]
\ No newline at end of file
+__all__ = [index, sector, food_and_beverages]
\ No newline at end of file
@@ -0,0 +1,1976 @@
+import contextlib
+import functools
+import json
+import math
+import os
+import threading
+import time
+import dash
+import dash_core_components as dcc
+import dash_html_components as html
+import dash_table
+import plotly.graph_objects as go
+import pandas as pd
+import dataset
+import downloads
+import ingestion
+import numpy as np
+import ranges
+import sampling
+import singleflight
+import startup
+import tiles
+from locations import StateTable
+from urllib.parse import quote
+from urllib.request import urlopen
+from app import app, server
+from dash.dependencies import Output, Input, State
+from dash.exceptions import PreventUpdate
+from flask import Response, abort, request
+
+"""
+Sector pages engine.
+A sector (e.g. food and beverages) is declared by its companies dataset and column mapping (see Sector).
+All the sectors share the states geometry and lookup table, the callbacks, the layout and the caches of this
+module, every request uses the sector of the current URL.
+"""
+"""
+Get the initial files to extract the data.
+The data will be used in the dashboard.
+"""
+# Startup timings (see startup.py)
+startup.checkpoint('imports')
+dirname = os.path.dirname(__file__)
+# States geojson source, the environment variable allows to use a local file (e.g. a synthetic dataset)
+states_source = os.environ.get(
+    'US_STATES_GEOJSON',
+    'https://raw.githubusercontent.com/PublicaMundi/MappingAPI/master/data/geojson/us-states.json')
+# Fetch and set US states geojson.
+with startup.phase('states geometry'):
+    if os.path.exists(states_source):
+        with open(states_source) as states_file:
+            states = json.load(states_file)
+    else:
+        with urlopen(states_source) as response:
+            states = json.load(response)
+with startup.phase('states table'):
+    # Create data frame with the locations (lat, lng, states).
+    locations = pd.read_excel(os.path.join(dirname, '../assets/long-and-lat-by-state.xlsx'), dtype={'Fip': str})
+    # States lookup table, the companies only store the state id (index on this table)
+    state_table = StateTable(locations)
+# Registered sectors by path (e.g. /food-and-beverages)
+sectors = {}
+# Sector of the current request (by thread)
+context = threading.local()
+# Concurrent callback requests with the same inputs share one computation, the workers share them too with
+# SINGLE_FLIGHT_WORKERS=1 (lock files, see singleflight.py)
+flights = singleflight.SingleFlight(
+    singleflight.locks_dirname if os.environ.get('SINGLE_FLIGHT_WORKERS', '0') == '1' else None)
+
+
+class Sector:
+    """
+    A sector page, declared by its companies dataset and column mapping
+    """
+
+    def __init__(self, name, title, source, columns=None, top_industries=None, sample_size=None):
+        """
+        :param name: Sector name, used on the URL (e.g. food-and-beverages)
+        :param title: Page title
+        :param source: Companies workbook (or CSV) path
+        :param columns: Dict with the dataset column name of the company columns with other name
+                        (e.g. {'Current employee estimate': 'Employees'})
+        :param top_industries: Industries of the business foundation chart (None for the 5 with more companies)
+        :param sample_size: Companies of the stratified sample used while the user is interacting, the map and the
+                            business foundation chart are approximated and refined when the user stops
+                            (None to always compute the exact results)
+        """
+        self.name = name
+        self.title = title
+        self.path = '/' + name
+        self.columns = columns or {}
+        self.top_industries = top_industries
+        self.sample_size = sample_size
+        # Set default dropdown values
+        self.dropdown_values = (None, None, None, None)
+        # Active version of the companies data, it is reloaded in the background when the dataset changes
+        self.data = dataset.DatasetHandle(source, self.load, warm=self.warm)
+
+    def load(self, source):
+        """
+        Load the companies dataset and prepare the data used by the dashboard
+        :param source: Companies dataset path
+        :return: Dict with the data of the version
+        """
+        with startup.phase('data load'):
+            # Create data frame with the companies (validated rows from the ingestion cache)
+            companies = ingestion.load_companies(source, state_table.codes(),
+                                                 {column: name for name, column in self.columns.items()})
+        with startup.phase('merges'):
+            # Replace the state code (e.g. TX - Dallas Texas) with the state id of the lookup table
+            companies['State id'] = state_table.ids(companies['State']).astype(np.int16)
+            companies = companies.drop(columns=['State'])
+
+        with startup.phase('index build'):
+            return self.index(companies)
+
+    def index(self, companies):
+        """
+        Prepare the filter index, the range counts and the sample of the companies
+        :param companies: Companies data frame (with the state id)
+        :return: Dict with the data of the version
+        """
+        # Filter index: values used by the dropdowns (computed once by version instead of every request)
+        industries = np.sort(companies['Industry'].dropna().unique().astype(str))
+        top_industries = self.top_industries
+        if top_industries is None:
+            top_industries = companies['Industry'].value_counts().index[:5].tolist()
+
+        # State and industry pairs with companies (the industry code is -1 when the company has no industry)
+        industry_codes = pd.Categorical(companies['Industry'], categories=industries).codes.astype(np.int64)
+        pair_keys, pairs = np.unique(companies['State id'].to_numpy(dtype=np.int64) * (len(industries) + 1) +
+                                     industry_codes + 1, return_inverse=True)
+        # Founded years of the slider (0 is an unknown year)
+        years = companies['Year founded'].to_numpy()
+        known_years = years[years > 0]
+        year_bounds = foundation_years
+        if len(known_years) > 0:
+            year_bounds = (int(known_years.min()), int(known_years.max()))
+
+        values = {
+            'companies': companies,
+            'industries': industries,
+            'top_industries': top_industries,
+            'state_ids': np.unique(companies['State id']),
+            'pair_states': pair_keys // (len(industries) + 1),
+            'pair_industries': pair_keys % (len(industries) + 1) - 1,
+            # Companies by pair, founded year and employees bin (answer the sliders without scanning rows)
+            'range_counts': ranges.RangeCounts(pairs, len(pair_keys), years,
+                                               companies['Current employee estimate'].to_numpy(), employees_marks),
+            'year_bounds': year_bounds,
+            # Rows by current employee estimate (biggest first, see get_top10_biggest_companies)
+            'biggest_order': np.argsort(-companies['Current employee estimate'].to_numpy(), kind='stable'),
+            'sample': None,
+        }
+
+        # Stratified sample (by state and industry) of the approximate mode
+        if self.sample_size is not None and len(companies) > self.sample_size:
+            rows, population, sampled = sampling.stratified_rows(pairs, self.sample_size)
+            values['sample'] = companies.iloc[rows].assign(**{
+                'Sample stratum': pairs[rows],
+                'Sample weight': sampling.row_weights(pairs[rows], population, sampled),
+            })
+            values['sample_population'] = population
+            values['sample_sampled'] = sampled
+
+        return values
+
+    def warm(self, new_dataset):
+        """
+        Prepare the layout of a new data version before it receives requests
+        :param new_dataset: New dataset
+        :return: None
+        """
+        with sector_context(self, new_dataset), startup.phase('figure prebuild'):
+            page_layout(self.name, new_dataset.version)
+
+    def page(self):
+        """
+        Get the sector page for the active data version
+        :return: HTML elements
+        """
+        with sector_context(self) as current:
+            return page_layout(self.name, current.version)
+
+
+def register(sector):
+    """
+    Register a sector: the page is served on its path and the data is loaded and watched
+    :param sector: Sector
+    :return: Sector
+    """
+    sectors[sector.path] = sector
+    # Build the first version and watch the dataset changes
+    with startup.phase(sector.name):
+        sector.data.current()
+    sector.data.watch()
+
+    return sector
+
+
+@contextlib.contextmanager
+def sector_context(sector, sector_dataset=None):
+    """
+    Set the sector of the current thread and pin its data version
+    :param sector: Sector
+    :param sector_dataset: Dataset to pin or None for the active version
+    :return: Context manager that yields the pinned dataset
+    """
+    previous = getattr(context, 'sector', None)
+    context.sector = sector
+    try:
+        with sector.data.pinned(sector_dataset) as current:
+            yield current
+    finally:
+        context.sector = previous
+
+
+def current_sector():
+    """
+    Get the sector of the current request
+    :return: Sector
+    """
+    return context.sector
+
+
+def current_data():
+    """
+    Get the data version of the current request
+    :return: Dataset
+    """
+    return context.sector.data.current()
+
+
+def sector_callback(function):
+    """
+    Decorator of the callbacks shared by the sectors.
+    The last argument of the callback is the URL path name (State), it selects the sector of the request.
+    The concurrent requests with the same inputs, triggers and data share one computation
+    :param function: Callback function
+    :return: Decorated function
+    """
+    @functools.wraps(function)
+    def wrapper(*args):
+        sector = sectors.get(args[-1])
+        if sector is None:
+            raise PreventUpdate
+
+        # The signature of the source identifies the data on every worker (the version is by process)
+        triggered = sorted(trigger['prop_id'] for trigger in dash.callback_context.triggered)
+        with sector_context(sector) as current:
+            key = singleflight.call_key([function.__name__, sector.name, current.signature, triggered, args[:-1]])
+
+            return flights.do(key, lambda: function(*args[:-1]))
+
+    return wrapper
+
+
+"""
+Prepare data frames that will be processed to be inserted into graphics and maps.
+And set configuration data for insertion in the dashboard. 
+"""
+# Color scale to be used on the map. Specifically in the grouping of employees by companies
+color_scale = (
+    ((0.0, '#000000'), (1.0, '#000000')),
+    ((0.0, '#0D0D0D'), (1.0, '#0D0D0D')),
+    ((0.0, '#383838'), (1.0, '#383838')),
+    ((0.0, '#676767'), (1.0, '#676767')),
+    ((0.0, '#9A9A9A'), (1.0, '#9A9A9A')),
+    ((0.0, '#D0D0D0'), (1.0, '#D0D0D0')),
+    ((0.0, '#FFFFFF'), (1.0, '#FFFFFF')),
+)
+color_scale_bubbles = ['#fa4032', '#e0bdbb', '#8cc0de', '#2c5c8a']
+# Number of employees per company groups (e.g. 1-50 employees)
+employees_per_company = (
+    (1, 50, '1-50'),
+    (51, 200, '51-200'),
+    (201, 500, '201-500'),
+    (501, 1000, '501-1000'),
+    (1001, 5000, '100-5000'),
+    (5001, 10000, '5001-10000'),
+    (10001, math.inf, '10001+')
+)
+# Milliseconds without interactions before the approximate results are replaced by the exact results
+exact_delay = 1500
+# Steps of the employees slider, the selected range is (step, next step] (the first step includes 0 employees)
+employees_marks = (0, 10, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000)
+# Years of the business foundation chart when the founded year slider is not used
+foundation_years = (2000, 2018)
+# Rows of the first chunk of the top 10 search (see get_top10_biggest_companies)
+top10_chunk_size = 2000
+# Triggers of update_graphs that don't change the dropdowns options
+options_unchanged_triggers = ('years_slider.value', 'employees_slider.value', 'exact-timer.n_clicks')
+
+"""
+Create graphic object like maps and bar charts.
+Add the graphic object data to the Figure.
+The Figure will be inserted in the layout page.
+"""
+
+# Columns of the companies table (State is the state name of the lookup table)
+table_columns = ('Name', 'Industry', 'Year founded', 'Current employee estimate', 'Locality', 'State', 'Domain')
+table_numeric_columns = ('Year founded', 'Current employee estimate')
+# Operators of the companies table filter query (e.g. {Year founded} > 2000 && {Name} contains bakery)
+table_filter_operators = (
+    ('ge ', '>='),
+    ('le ', '<='),
+    ('lt ', '<'),
+    ('gt ', '>'),
+    ('ne ', '!='),
+    ('eq ', '='),
+    ('contains ',),
+)
+
+
+def calculate_bubble(state_companies, max_state_companies):
+    """
+    Calculate bubble size using the number of companies by state
+    :param state_companies: Total companies by state
+    :param max_state_companies: Max companies found in a state
+    :return: Bubble size
+    """
+    bubble_size = state_companies / max_state_companies * 100 * 1.7
+
+    # Allow a maximum and minimum values
+    if bubble_size < 10:
+        return 10
+    elif bubble_size > 40:
+        return 40
+
+    return bubble_size
+
+
+def filter_employees_ranges(rows, employees_ranges):
+    """
+    Filter rows by employees range
+    :param rows: Companies rows
+    :param employees_ranges: Employees ranges
+    :return:
+    """
+    if employees_ranges is not None:
+        filtered = pd.DataFrame()
+
+        for employee_range in employees_ranges:
+            filtered = filtered.append(
+                rows[rows['Current employee estimate'].between(employee_range[0], employee_range[1])])
+
+        return filtered
+
+    return rows
+
+
+def filter_company_rows(rows, industries, employees_ranges, name_states, locality_names, year_range=None):
+    """
+    Filter companies by common params
+    :param rows: Company rows
+    :param industries: Iterable with industries or None for all
+    :param employees_ranges: Iterable with employees or None for all
+    :param name_states: Iterable with state names or None for all
+    :param locality_names: Iterable with localities or None for all
+    :param year_range: Tuple with the first and last founded year or None for all
+    :return: Filtered rows dataframe
+    """
+    filtered = rows
+
+    # Filter by founded year range
+    if year_range is not None:
+        filtered = filtered[filtered['Year founded'].between(year_range[0], year_range[1])]
+
+    # Filter by industries
+    if industries is not None:
+        filtered = filtered[filtered['Industry'].isin(industries)]
+
+    # Filter by employees ranges
+    filtered = filter_employees_ranges(filtered, employees_ranges)
+
+    # Filter by name states
+    if name_states is not None:
+        filtered = filtered[state_table.mask(filtered['State id'], state_table.ids_by_name(name_states))]
+
+    # Filter by locality name
+    if locality_names is not None:
+        filtered = filtered[filtered['Locality'].isin(locality_names)]
+
+    return filtered
+
+
+def companies_coordinates(rows):
+    """
+    Get the coordinates of every company.
+    The locality coordinates are used when the workbook has them, otherwise the state coordinates
+    :param rows: Company rows
+    :return: Tuple with latitudes and longitudes
+    """
+    latitudes = state_table.latitude.take(rows['State id'])
+    longitudes = state_table.longitude.take(rows['State id'])
+
+    if 'Locality latitude' in rows.columns and 'Locality longitude' in rows.columns:
+        latitudes = rows['Locality latitude'].fillna(pd.Series(latitudes, index=rows.index))
+        longitudes = rows['Locality longitude'].fillna(pd.Series(longitudes, index=rows.index))
+        return latitudes.to_numpy(dtype=float), longitudes.to_numpy(dtype=float)
+
+    return latitudes, longitudes
+
+
+@functools.lru_cache(maxsize=64)
+def companies_density_grid(sector_name, version, filters, zoom):
+    """
+    Bin the filtered companies in the density grid of a zoom level (cached by sector, data version, filters and zoom)
+    :param sector_name: Sector name (must be the sector of the request)
+    :param version: Data version (must be the pinned version)
+    :param filters: JSON string with the density filters (see density_tiles_url)
+    :param zoom: Zoom level
+    :return: Density grid
+    """
+    filters = json.loads(filters)
+    density_companies = filter_company_rows(current_data().companies, filters['industries'],
+                                            filters['employees_ranges'], filters['name_states'],
+                                            filters['locality_names'], filters.get('year_range'))
+
+    # Filter by company names
+    if filters['company_names'] is not None:
+        density_companies = density_companies[density_companies['Name'].isin(filters['company_names'])]
+
+    # Apply soft filter
+    soft_filter = filters['soft_filter']
+    if soft_filter is not None:
+        if soft_filter['Year founded'] is not None:
+            density_companies = density_companies[density_companies['Year founded'] == soft_filter['Year founded']]
+        if soft_filter['Industry'] is not None:
+            density_companies = density_companies[density_companies['Industry'] == soft_filter['Industry']]
+
+    latitudes, longitudes = companies_coordinates(density_companies)
+
+    return tiles.density_grid(latitudes, longitudes, zoom)
+
+
+def density_tiles_url(company_names, industries, employees_ranges, name_states, locality_names, soft_filter,
+                      year_range=None):
+    """
+    Format the URL of the density tiles for the current filters
+    :param company_names: Iterable with company names or None for all
+    :param industries: Iterable with industries or None for all
+    :param employees_ranges: Tuple with ranges or None for all (e.g. (1, 50))
+    :param name_states: Iterable with the state or None for all
+    :param locality_names: Iterable with the localities or None for all
+    :param soft_filter: Soft filter
+    :param year_range: Tuple with the first and last founded year or None for all
+    :return: Tiles URL template ({z}, {x} and {y} are replaced by the map)
+    """
+    # The version prevents the browser from using the tiles of a previous version
+    version = current_data().version
+    filters = json.dumps({
+        'company_names': company_names,
+        'industries': industries,
+        'employees_ranges': employees_ranges,
+        'name_states': name_states,
+        'locality_names': locality_names,
+        'soft_filter': soft_filter,
+        'year_range': year_range,
+    }, sort_keys=True, default=float)
+
+    return '/tiles/density/' + current_sector().name + '/{z}/{x}/{y}.png?version=' + str(version) + \
+           '&filters=' + quote(filters)
+
+
+@server.route('/tiles/density/<sector_name>/<int:zoom>/<int:x>/<int:y>.png')
+def density_tile(sector_name, zoom, x, y):
+    """
+    Serve a density tile of the companies of a sector
+    :param sector_name: Sector name
+    :param zoom: Zoom level
+    :param x: Tile column
+    :param y: Tile row
+    :return: PNG response
+    """
+    sector = sectors.get('/' + sector_name)
+    if sector is None:
+        abort(404)
+    if not tiles.min_zoom <= zoom <= tiles.max_zoom or not 0 <= x < 2 ** zoom or not 0 <= y < 2 ** zoom:
+        abort(404)
+
+    # Normalize the filters, so the same selection always hits the same cache entry
+    try:
+        filters = json.dumps(json.loads(request.args.get('filters', 'null')), sort_keys=True)
+        with sector_context(sector) as current:
+            grid = companies_density_grid(sector.name, current.version, filters, zoom)
+    except (ValueError, TypeError, KeyError):
+        abort(400)
+
+    response = Response(tiles.render_tile(grid, zoom, x, y), mimetype='image/png')
+    if request.args.get('version') == str(current.version):
+        response.cache_control.max_age = 3600
+    else:
+        # Other version than the URL (e.g. a worker that didn't reload yet), the tile must not be cached
+        response.cache_control.no_store = True
+
+    return response
+
+
+def selected_pairs(industries, name_states, state_id=None, industry=None):
+    """
+    Select the state and industry pairs of the filters (used with the range counts)
+    :param industries: Iterable with industries or None for all
+    :param name_states: Iterable with state names or None for all
+    :param state_id: State id of the soft filter or None
+    :param industry: Industry of the soft filter or None
+    :return: Boolean array by pair
+    """
+    data = current_data()
+    selected = np.ones(len(data.pair_states), dtype=bool)
+
+    if industries is not None:
+        selected &= np.isin(data.pair_industries, np.flatnonzero(np.isin(data.industries, list(industries))))
+    if industry is not None:
+        selected &= np.isin(data.pair_industries, np.flatnonzero(data.industries == industry))
+    if name_states is not None:
+        selected &= state_table.mask(data.pair_states, state_table.ids_by_name(name_states))
+    if state_id is not None:
+        selected &= data.pair_states == state_id
+
+    return selected
+
+
+def foundation_frame(window, top_industries, companies, errors=None):
+    """
+    Format the companies by founded year and industry as the business foundation chart data
+    :param window: Tuple with the first and last founded year of the chart
+    :param top_industries: Sorted top industries
+    :param companies: Array with the companies by year (rows) and industry (columns)
+    :param errors: Array with the error bounds of the estimated companies (same shape) or None
+    :return: Data frame with the year, industry and companies (and error) of the groups with companies
+    """
+    # Groups with companies, sorted by year and industry (as the groupby)
+    year_positions, industry_positions = np.nonzero(companies)
+    business_foundation_data = pd.DataFrame({
+        'Year founded': year_positions + window[0],
+        'Industry': top_industries[industry_positions],
+        'Companies': np.round(companies[year_positions, industry_positions]).astype(np.int64),
+    })
+    if errors is not None:
+        business_foundation_data['Error'] = np.round(errors[year_positions, industry_positions]).astype(np.int64)
+
+    return business_foundation_data
+
+
+def business_foundation_chart(employees_ranges, name_states, locality_names, selected_point, soft_filters,
+                              year_range=None, approximate=False):
+    """
+    Create business foundation by year chart (top 5)
+    :param employees_ranges: Tuple with ranges or None for all (e.g. (1, 50))
+    :param name_states: Iterable with the state or None for all.
+    :param locality_names: Iterable with the localities or None for all
+    :param selected_point:
+    :param soft_filters:
+    :param year_range: Tuple with the first and last founded year of the chart or None for the default years
+    :param approximate: Estimate the companies from the sector sample (when the sector has sample)
+    :return: Figure instance with the chart (layout meta approximate is True when the companies were estimated)
+    """
+    data = current_data()
+    window = year_range or foundation_years
+    top_industries = np.sort(np.asarray(data.top_industries, dtype=str))
+    years_count = window[1] - window[0] + 1
+    soft_state = soft_filters['State'] if soft_filters is not None else None
+
+    if locality_names is None and data.range_counts.aligned(employees_ranges):
+        # Count companies in founded year groups with the range counts (exact, no rows are scanned)
+        pairs, cell_years, cell_companies = data.range_counts.cells(window)
+        code_positions = pd.Categorical(data.industries, categories=top_industries).codes.astype(np.int64)
+        pair_positions = np.where(data.pair_industries >= 0, code_positions[data.pair_industries], -1)
+        selected = selected_pairs(None, name_states, soft_state)[pairs] & (pair_positions[pairs] >= 0)
+        companies = np.bincount(
+            (cell_years[selected] - window[0]) * len(top_industries) + pair_positions[pairs[selected]],
+            weights=cell_companies[selected] @ data.range_counts.employees_bins(employees_ranges),
+            minlength=years_count * len(top_industries))
+        business_foundation_data = foundation_frame(window, top_industries,
+                                                    companies.reshape(years_count, len(top_industries)))
+        approximate = False
+    else:
+        # Filter by top 5 industries
+        approximate = approximate and data.sample is not None
+        companies = data.sample if approximate else data.companies
+        years = companies[companies['Industry'].isin(data.top_industries)]
+
+        # Filter by employees ranges
+        years = filter_employees_ranges(years, employees_ranges)
+
+        # Filter by name states
+        if name_states is not None:
+            years = years[state_table.mask(years['State id'], state_table.ids_by_name(name_states))]
+
+        # Filter by locality
+        if locality_names is not None:
+            years = years[years['Locality'].isin(locality_names)]
+
+        # Soft filter
+        if soft_state is not None:
+            years = years[years['State id'] == soft_state]
+
+        # Select the years lapse
+        years = years[years['Year founded'].between(window[0], window[1])]
+        if approximate:
+            # Estimate companies in founded year groups
+            companies, errors = sampling.estimate_counts(
+                years['Sample stratum'],
+                (years['Year founded'].to_numpy(dtype=np.int64) - window[0]) * len(top_industries) +
+                pd.Categorical(years['Industry'], categories=top_industries).codes.astype(np.int64),
+                years_count * len(top_industries), data.sample_population, data.sample_sampled)
+            business_foundation_data = foundation_frame(window, top_industries,
+                                                        companies.reshape(years_count, len(top_industries)),
+                                                        errors.reshape(years_count, len(top_industries)))
+        else:
+            # Count companies in founded year groups
+            business_foundation_data = years.groupby(['Year founded', 'Industry'], as_index=False).size()
+
+            # Before create charts, rename column for best reading
+            business_foundation_data = business_foundation_data.rename(columns={'size': 'Companies'})
+
+    # Create chart, one line by industry (the approximate companies are shown with their error bound)
+    custom_columns = ['Year founded', 'Industry', 'Companies'] + (['Error'] if approximate else [])
+    hover_companies = 'Companies=~%{y} ± %{customdata[3]}' if approximate else 'Companies=%{y}'
+    fig = go.Figure(
+        data=[
+            go.Scatter(
+                x=industry_data['Year founded'],
+                y=industry_data['Companies'],
+                customdata=industry_data[custom_columns].to_numpy(),
+                name=industry,
+                legendgroup=industry,
+                showlegend=True,
+                mode='markers+lines',
+                hovertemplate='Industry=%{customdata[1]}<br>Year founded=%{x}<br>' + hover_companies +
+                              '<extra></extra>',
+            )
+            for industry, industry_data in business_foundation_data.groupby('Industry', sort=False)
+        ],
+        layout={
+            'title': 'Business foundation by year (Top 5 industries)',
+            'xaxis': {'title': 'Year founded'},
+            'yaxis': {'title': 'Companies'},
+            'legend': {'title': 'Industry', 'tracegroupgap': 0},
+        },
+    )
+
+    selected_rows = business_foundation_data.iloc[0:0]
+    if selected_point is not None:
+        selected_rows = business_foundation_data[
+            (business_foundation_data['Year founded'] == selected_point['customdata'][0]) &
+            (business_foundation_data['Industry'] == selected_point['customdata'][1])
+        ]
+
+    # The selected point is not annotated when it is not on the chart (e.g. out of the founded years)
+    if len(selected_rows) > 0:
+        value_y = selected_rows.iloc[0]
+
+        fig.add_annotation(
+            x=selected_point['x'],
+            y=value_y['Companies'],
+            xref="x",
+            yref="y",
+            text='<b>Year:</b> {} <br><b>Industry:</b> {} <br>'.format(
+                selected_point['customdata'][0], selected_point['customdata'][1]),
+            showarrow=True,
+            font=dict(
+                family="Courier New, monospace",
+                size=12,
+                color="#ffffff"
+            ),
+            align="center",
+            arrowhead=2,
+            arrowsize=1,
+            arrowwidth=2,
+            arrowcolor="#636363",
+            ax=20,
+            ay=-30,
+            bordercolor="#c7c7c7",
+            borderwidth=2,
+            borderpad=4,
+            bgcolor="#ff7f0e",
+            opacity=0.8
+        )
+    fig.update_layout(
+        clickmode='event+select',
+        # Tell the callback if the companies were estimated (the exact path is taken when it is fast)
+        meta={'approximate': approximate},
+    )
+
+    return fig
+
+
+def get_top10_biggest_companies(industries, employees_ranges, name_states, locality_names, soft_filter,
+                                year_range=None):
+    """
+    GEt top 10 for biggest companies
+    :param industries: Iterable with industries or None for all
+    :param employees_ranges: Iterable with employees or None for all
+    :param name_states: Iterable with state names or None for all
+    :param locality_names: Iterable with localities or None for all
+    :param soft_filter:
+    :param year_range: Tuple with the first and last founded year or None for all
+    :return:
+    """
+    data = current_data()
+    found = []
+    found_count = 0
+    start = 0
+    size = top10_chunk_size
+
+    # Filter the rows biggest first, by growing chunks, until the top 10 is found (the rows of the next chunks
+    # are smaller, so only the selective filters scan every row)
+    while start < len(data.biggest_order) and found_count < 10:
+        biggest_companies = data.companies.iloc[data.biggest_order[start:start + size]]
+        start += size
+        size *= 4
+
+        # Filter rows
+        biggest_companies = filter_company_rows(biggest_companies, industries, employees_ranges, name_states,
+                                                locality_names, year_range)
+
+        # Apply soft filter
+        if soft_filter is not None:
+            if soft_filter['State'] is not None:
+                biggest_companies = biggest_companies[biggest_companies['State id'] == soft_filter['State']]
+            if soft_filter['Year founded'] is not None:
+                biggest_companies = biggest_companies[
+                    biggest_companies['Year founded'] == soft_filter['Year founded']]
+            if soft_filter['Industry'] is not None:
+                biggest_companies = biggest_companies[biggest_companies['Industry'] == soft_filter['Industry']]
+
+        found.append(biggest_companies)
+        found_count += len(biggest_companies)
+
+    # Biggest by current employee estimate (only the top 10 are ordered)
+    biggest_companies = pd.concat(found) if len(found) > 0 else data.companies.iloc[:0]
+
+    return biggest_companies.nlargest(10, 'Current employee estimate')
+
+
+def biggest_companies_chart(industries, employees_ranges, name_states, locality_names, soft_filter, year_range=None,
+                            biggest_companies=None):
+    """
+    Create biggest companies chart (top 10)
+    :param soft_filter:
+    :param industries: Iterable with industries or None for all
+    :param employees_ranges: Tuple with ranges or None for all (e.g. (1, 50))
+    :param name_states: Iterable with the state or None for all
+    :param locality_names: Iterable with the localities or None for all
+    :param year_range: Tuple with the first and last founded year or None for all
+    :param biggest_companies: Top 10 of the same filters (see get_top10_biggest_companies) or None to fetch it
+    :return: Figure instance with the chart
+    """
+    # Fetch companies data
+    if biggest_companies is None:
+        biggest_companies = get_top10_biggest_companies(industries, employees_ranges, name_states, locality_names,
+                                                        soft_filter, year_range)
+    biggest_companies = biggest_companies \
+        .sort_values(by=['Current employee estimate'], ascending=True)
+
+    # Create chart
+    fig = go.Figure(go.Bar(
+        x=biggest_companies['Current employee estimate'],
+        y=biggest_companies['Name'],
+        orientation='h'))
+
+    # Remove margins
+    fig.update_layout(
+        margin={'l': 0, 'r': 0, 't': 0, 'b': 0},
+    )
+
+    return fig
+
+
+def companies_states_map(company_names, industries, employees_ranges, name_states, locality_names, selected_points,
+                         soft_filter, year_range=None, approximate=False, tiles_ranges=None):
+    """
+    Create companies mapbox with the data computed
+    :param company_names: Iterable with company names or None for all
+    :param industries: Iterable with industries or None for all
+    :param employees_ranges: Tuple with ranges or None for all (e.g. (1, 50))
+    :param name_states: Iterable with the state or None for all
+    :param locality_names: Iterable with the localities or None for all
+    :param selected_points:
+    :param soft_filter:
+    :param year_range: Tuple with the first and last founded year or None for all
+    :param approximate: Estimate the companies from the sector sample (when the sector has sample)
+    :param tiles_ranges: Tuple with the employees ranges and the founded year range of the density tiles or None
+                         for the ranges of the filters
+    :return: Figure instance with the map (layout meta approximate is True when the companies were estimated)
+    """
+    current = current_data()
+    range_counts = current.range_counts
+    # Error bounds of the estimated companies by state
+    companies_errors = None
+
+    if company_names is None and locality_names is None and range_counts.aligned(employees_ranges):
+        # Count companies with the range counts (exact, no rows are scanned)
+        soft_industry = None
+        counts_year_range = year_range
+        if soft_filter is not None:
+            soft_industry = soft_filter['Industry']
+            if soft_filter['Year founded'] is not None:
+                year = soft_filter['Year founded']
+                counts_year_range = (year, year) if year_range is None else \
+                    (max(year_range[0], year), min(year_range[1], year))
+        pairs_companies, pairs_employees = range_counts.totals(counts_year_range)
+        selected = selected_pairs(industries, name_states, industry=soft_industry)
+        bins = range_counts.employees_bins(employees_ranges)
+
+        # Companies and employees by state id (the state id is the row) and employees bin
+        states_companies = np.zeros((len(state_table), range_counts.bins))
+        states_employees = np.zeros((len(state_table), range_counts.bins))
+        np.add.at(states_companies, current.pair_states[selected], pairs_companies[selected] * bins)
+        np.add.at(states_employees, current.pair_states[selected], pairs_employees[selected] * bins)
+        approximate = False
+    else:
+        # Set companies with locations
+        approximate = approximate and current.sample is not None
+        companies_states = current.sample if approximate else current.companies
+
+        # Filter rows
+        companies_states = filter_company_rows(companies_states, industries, employees_ranges, name_states,
+                                               locality_names, year_range)
+        # Filter by company names
+        if company_names is not None:
+            companies_states = companies_states[companies_states['Name'].isin(company_names)]
+
+        # Apply soft filter
+        if soft_filter is not None:
+            if soft_filter['Year founded'] is not None:
+                companies_states = companies_states[companies_states['Year founded'] == soft_filter['Year founded']]
+            if soft_filter['Industry'] is not None:
+                companies_states = companies_states[companies_states['Industry'] == soft_filter['Industry']]
+
+        # Companies and employees by state id (the state id is the row) and employees bin, the estimates use
+        # the sample weights
+        state_ids = companies_states['State id'].to_numpy(dtype=np.int64)
+        employees = companies_states['Current employee estimate'].to_numpy(dtype=float)
+        weights = companies_states['Sample weight'].to_numpy() if approximate else np.ones(len(employees))
+        cells = state_ids * range_counts.bins + np.searchsorted(range_counts.employees_edges, employees)
+        states_companies = np.bincount(cells, weights=weights, minlength=len(state_table) * range_counts.bins)
+        states_companies = states_companies.reshape(len(state_table), range_counts.bins)
+        states_employees = np.bincount(cells, weights=employees * weights,
+                                       minlength=len(state_table) * range_counts.bins)
+        states_employees = states_employees.reshape(len(state_table), range_counts.bins)
+
+        if approximate:
+            _, companies_errors = sampling.estimate_counts(companies_states['Sample stratum'], state_ids,
+                                                           len(state_table), current.sample_population,
+                                                           current.sample_sampled)
+
+    # Graphic objects
+    data = []
+    # Iterator count
+    i = 0
+    for employees in employees_per_company:
+        # Companies by state in the employees range (e.g. between 1 and 50)
+        range_companies = states_companies @ range_counts.employees_bins([employees[:2]])
+        range_states = np.flatnonzero(range_companies)
+
+        # Extract fip codes
+        fip = state_table.fip.take(range_states)
+        # Extract states
+        state = state_table.label.take(range_states)
+        # Number of companies (the estimates start with ~)
+        companies_number = '{}{:.0f}'.format('~' if approximate else '', range_companies.sum())
+
+        # Name format to be used on the gray scale
+        gte = '+' if math.isinf(employees[1]) else '-{}'.format(employees[1])
+        name = '''
+            <i>{}{} Employees</i> <br>
+            <b>{} Companies</b> <br>
+        '''.format(employees[0], gte, companies_number)
+
+        # Create grey scale values grouping by employees range (a single color by range)
+        data.append(go.Choroplethmapbox(
+            geojson=states,
+            locations=fip,
+            z=range_companies[range_states],
+            showlegend=True,
+            name=name,
+            colorscale=color_scale[i],
+            showscale=False,
+            hovertemplate=state,
+        ))
+
+        # Update iterator count
+        i = i + 1
+
+    # Count companies and sum employees by state id (the state id is the position on the counts)
+    companies_count = np.round(states_companies.sum(axis=1)).astype(np.int64)
+    employees_sum = states_employees.sum(axis=1)
+    # States with companies
+    states_ids = np.flatnonzero(companies_count)
+    # AVG employees by state
+    avg_employees_states = pd.Series(np.round(employees_sum[states_ids] / companies_count[states_ids]))
+    # Count occurrences in the group process (number of companies)
+    avg_employees_states_count = pd.Series(companies_count[states_ids])
+    # Set the max companies by state
+    max_companies_state = avg_employees_states_count.max()
+    # Extract state labels
+    states_labels = pd.Series(state_table.label.take(states_ids))
+    # Hover values, the estimates show the error bound
+    employees_label = avg_employees_states.astype(str)
+    companies_label = avg_employees_states_count.astype(str)
+    if approximate:
+        employees_label = '~' + employees_label
+        companies_label = '~' + companies_label + ' ± ' + \
+            pd.Series(np.round(companies_errors[states_ids]).astype(np.int64)).astype(str)
+
+    # Add bubble indicators to the map
+    data.append(go.Scattermapbox(
+        lat=state_table.latitude.take(states_ids),
+        lon=state_table.longitude.take(states_ids),
+        customdata=states_ids,
+        selectedpoints=selected_points,
+        mode='markers',
+        marker=go.scattermapbox.Marker(
+            size=avg_employees_states_count.apply(
+                lambda state_companies: calculate_bubble(state_companies, max_companies_state)),
+            color=avg_employees_states,
+            colorscale=color_scale_bubbles,
+            symbol='circle',
+            showscale=True,
+            colorbar=go.scattermapbox.marker.ColorBar(
+                x=-0.1,
+                title=go.scattermapbox.marker.colorbar.Title(
+                    text='Number of employees per company',
+                    side='right',
+                ),
+            ),
+        ),
+        name='',
+        text='Name of state: <b>' + states_labels + '</b><br>' +
+             'Employees per company: <b>' + employees_label + '</b><br>' +
+             'Number of companies: <b>' + companies_label,
+        showlegend=False,
+    ))
+
+    # Create figure element
+    map_figure = go.Figure(data)
+    tiles_employees_ranges, tiles_year_range = tiles_ranges or (employees_ranges, year_range)
+    # Update Mapbox settings
+    map_figure.update_layout(
+        mapbox_style='carto-positron',
+        mapbox_zoom=3,
+        height=600,
+        mapbox_center={'lat': 37.0902, 'lon': -95.7129},
+        margin={'r': 0, 't': 0, 'l': 0, 'b': 0},
+        clickmode='event+select',
+        # Tell the callback if the companies were estimated (the exact path is taken when it is fast)
+        meta={'approximate': approximate},
+        # Density of the companies, the map requests the visible tiles to the server
+        mapbox_layers=[{
+            'sourcetype': 'raster',
+            'source': [density_tiles_url(company_names, industries, tiles_employees_ranges, name_states,
+                                         locality_names, soft_filter, tiles_year_range)],
+            'opacity': 0.8,
+            'minzoom': tiles.min_zoom,
+            'maxzoom': tiles.max_zoom,
+        }],
+    )
+
+    return map_figure
+
+
+"""
+The layout page.
+All the information tha will be rendered on the browser
+"""
+
+
+def category_employees(current_employees):
+    """
+    Get category label by current employees amount
+    :param current_employees: Number of current employees
+    :return: e.g. 1-50, 1001-500, etc.
+    """
+    for employees_range in employees_per_company:
+        if employees_range[0] <= current_employees <= employees_range[1]:
+            lte = '+' if math.isinf(employees_range[1]) else '-{}'.format(employees_range[1])
+            return '{}{}'.format(employees_range[0], lte)
+
+
+def company_domain(company_name):
+    """
+    Format company URL based on company name and bing search URL or simple return the domain
+    :param company_name: The company name
+    :return:
+    """
+    return 'https://www.bing.com/news/search?q={}&FORM=HDRSC6'.format(company_name)
+
+
+def top_10_companies_tabs(industries, employees_ranges, name_states, locality_names, soft_filter, year_range=None,
+                          biggest_companies=None):
+    """
+    Create the HTML structure (tabs) with the top 10 companies, based on the industry type
+    :param industries: Iterable with industries or None for all
+    :param employees_ranges: Tuple with ranges or None for all (e.g. (1, 50))
+    :param name_states: Iterable with the state or None for all
+    :param locality_names: Iterable with the localities or None for all
+    :param soft_filter: Soft filter
+    :param year_range: Tuple with the first and last founded year or None for all
+    :param biggest_companies: Top 10 of the same filters (see get_top10_biggest_companies) or None to fetch it
+    :return: HTML elements
+    """
+    filtered_companies = biggest_companies
+    if filtered_companies is None:
+        filtered_companies = get_top10_biggest_companies(industries, employees_ranges, name_states, locality_names,
+                                                         soft_filter, year_range)
+    tabs = []
+    tabs_content = []
+
+    # Generate tabs and content
+    for index, row in filtered_companies.iterrows():
+        tabs.append(
+            html.Li(className='tab', children=[
+                html.A(
+                    className='active' if index == 0 else '',
+                    href='#{}'.format(row['Domain']),
+                    children=row['Name'],
+                )
+            ])
+        )
+
+        tabs_content.append(
+            html.Div(id=row['Domain'], className='col s12', children=[
+                html.Ul(className='collection with-header', children=[
+                    html.Li(className='collection-header', children=[
+                        html.H4('{}, Founding in {}'.format(row['Name'], row['Year founded'])),
+                    ]),
+                    html.Li(
+                        className='collection-item',
+                        children='Located in {}'.format(row['Id_locality'])
+                    ),
+                    html.Li(
+                        className='collection-item',
+                        children='Linkedin: {}'.format(row['Linkedin url'])
+                    ),
+                    html.Li(
+                        className='collection-item',
+                        children='Sub-industry: {}'.format(row['Industry'])
+                    ),
+                    html.Li(
+                        className='collection-item',
+                        children='Category by current employees: {}'.format(
+                            category_employees(row['Current employee estimate']))
+                    ),
+                    html.Li(
+                        className='collection-item',
+                        children='Current employees: {}'.format(row['Current employee estimate'])
+                    ),
+                    html.Li(
+                        className='collection-item',
+                        children=[
+                            html.A(
+                                href='https://{}'.format(row['Domain']),
+                                children='Web site: {}'.format(row['Domain']),
+                                target='_blank',
+                            )
+                        ],
+                    ),
+                ]),
+                html.Iframe(
+                    src='about:blank',
+                    **{'data-fallback': company_domain(row['Name'])},
+                    width='100%',
+                    height='500px',
+                ),
+            ])
+        )
+
+    return html.Div(className='row', children=[
+        html.Div(className='col s12', children=[
+            html.Ul(className='tabs', children=tabs)
+        ]),
+        html.Div(children=tabs_content),
+    ])
+
+
+def company_names_options(search):
+    """
+    Perform a search in the companies and format to options dropdown
+    Create a dropdown with company names data
+    :param search: Search string
+    :return:
+    """
+    options = []
+
+    # Catch empty string
+    if search == '':
+        return options
+
+    # Perform search
+    if search is not None:
+        company_names = current_data().companies
+        # First apply dropdown filter
+        dropdown_values = current_sector().dropdown_values
+        if len(dropdown_values) != 0:
+            company_names = filter_company_rows(company_names, dropdown_values[0], dropdown_values[1],
+                                                dropdown_values[2], dropdown_values[3])
+
+        # Second find by contains
+        company_names = company_names[company_names['Name'].str.contains(search, na=False, case=False) == True].head(50)
+
+        # Append companies to options dropdown
+        for company_name in company_names['Name']:
+            options.append({
+                'label': str(company_name),
+                'value': str(company_name),
+            })
+
+    return options
+
+
+@app.callback(
+    [
+        Output('company_names_dropdown', 'options'),
+        Output('company_names_dropdown', 'value'),
+    ],
+    Input('company_name_input', 'value'),
+    State('url', 'pathname'))
+@sector_callback
+def update_company_names_dropdown(company_name):
+    """
+    Listen input changes on company name input
+    :param company_name: The name of company
+    :return:
+    """
+    company_names = company_names_options(company_name)
+
+    value = ''
+    if len(company_names) > 0:
+        value = [company['value'] for company in company_names]
+
+    return company_names, value
+
+
+def industries_dropdown():
+    """
+    Create a dropdown element with industry options
+    :return: Dropdown
+    """
+    # Sorted unique industries (filter index)
+    industries = current_data().industries
+    options = []
+
+    # Append industries to options dropdown
+    for industry in industries:
+        options.append({
+            'label': str(industry),
+            'value': str(industry),
+        })
+
+    return dcc.Dropdown(
+        options=options,
+        id='industries_dropdown',
+        placeholder='Industries (all selected)',
+        multi=True,
+    )
+
+
+def range_employees_dropdown():
+    """
+    Create a dropdown element with range employees options
+    :return: Dropdown
+    """
+    options = []
+
+    # Append ranges top options dropdown
+    for employees_range in employees_per_company:
+        options.append({
+            'label': employees_range[2],
+            'value': employees_range[2],
+        })
+
+    return dcc.Dropdown(
+        options=options,
+        id='range_employees_dropdown',
+        placeholder='Number of employees (all selected)',
+        multi=True,
+    )
+
+
+def states_dropdown():
+    """
+    Create a dropdown element with state options
+    :return: Dropdown
+    """
+    # States with companies (filter index)
+    state_names = state_table.name.take(current_data().state_ids)
+    # Sort by state name
+    state_names = np.sort(state_names)
+    options = []
+
+    # Append states to options dropdown
+    for state_name in state_names:
+        options.append({
+            'label': str(state_name),
+            'value': str(state_name),
+        })
+
+    return dcc.Dropdown(
+        options=options,
+        id='states_dropdown',
+        placeholder='States (all selected)',
+        multi=True,
+    )
+
+
+def localities_dropdown():
+    """
+    Create a dropdown element with localities options
+    :return: Dropdown
+    """
+    # Group by state
+    locality_names = current_data().companies.groupby(['Locality'], as_index=False).mean()
+    # Sort by state name
+    locality_names = locality_names.sort_values(by='Locality')
+    options = []
+
+    # Append states to options dropdown
+    for locality_name in locality_names['Locality']:
+        options.append({
+            'label': str(locality_name),
+            'value': str(locality_name),
+        })
+
+    return dcc.Dropdown(
+        options=options,
+        id='localities_dropdown',
+        placeholder='Localities (all selected)',
+        multi=True,
+    )
+
+
+def years_slider():
+    """
+    Create a range slider element with the founded years
+    :return: Range slider
+    """
+    first_year, last_year = current_data().year_bounds
+    # Mark every decade (or half century for long ranges)
+    step = 10 if last_year - first_year <= 100 else 50
+    marks = {year: str(year) for year in range(first_year + (-first_year) % step, last_year + 1, step)}
+    marks.update({first_year: str(first_year), last_year: str(last_year)})
+
+    return dcc.RangeSlider(
+        id='years_slider',
+        min=first_year,
+        max=last_year,
+        step=1,
+        value=[first_year, last_year],
+        marks=marks,
+        # The counts are answered by the range counts, so the charts are updated while dragging
+        updatemode='drag',
+    )
+
+
+def employees_slider():
+    """
+    Create a range slider element with the employees steps
+    :return: Range slider
+    """
+    marks = {step: '{:,}'.format(employees) for step, employees in enumerate(employees_marks)}
+    marks[len(employees_marks)] = 'Max'
+
+    return dcc.RangeSlider(
+        id='employees_slider',
+        min=0,
+        max=len(employees_marks),
+        step=None,
+        value=[0, len(employees_marks)],
+        marks=marks,
+        updatemode='drag',
+    )
+
+
+def update_dropdowns(company_names, industries, employees_ranges, state_names, localities):
+    """
+    Update the dropdowns options based on selected value for any dropdown
+    :param company_names: Company name input (this is not updated)
+    :param industries: Industries selected value
+    :param employees_ranges: Employees ranges selected value
+    :param state_names: State names selected value
+    :param localities: Localities selected value
+    :return: Update options for all dropdowns
+    """
+    data = current_data()
+    # Filtered companies
+    fi_companies = data.companies
+    # Industries options
+    in_options = []
+    # Employees ranges options
+    er_options = []
+    # State names options
+    sn_options = []
+    # Localities options
+    lo_options = []
+
+    # Filter by company names
+    if company_names is not None and len(company_names) != 0:
+        fi_companies = fi_companies[fi_companies['Name'].isin(company_names)]
+
+    # Filter by all dropdown selected values
+    fi_companies = filter_company_rows(fi_companies, industries, None, state_names, None)
+
+    # Extract unique values
+    in_results = data.industries
+    er_results = []
+    sn_results = np.sort(state_table.name.take(data.state_ids))
+    lo_results = fi_companies['Locality'].sort_values(ascending=True).unique()
+    # Set employees ranges results
+    for employees_range in employees_per_company:
+        founded = fi_companies[
+            fi_companies['Current employee estimate'].between(employees_range[0], employees_range[1])]
+        if not founded.empty:
+            er_results.append(employees_range[2])
+
+    # Set options lists
+    for result in in_results:
+        in_options.append({
+            'label': str(result),
+            'value': str(result),
+        })
+    for result in er_results:
+        er_options.append({
+            'label': result,
+            'value': result,
+        })
+    for result in sn_results:
+        sn_options.append({
+            'label': str(result),
+            'value': str(result),
+        })
+    for result in lo_results:
+        lo_options.append({
+            'label': str(result),
+            'value': str(result),
+        })
+
+    return in_options, er_options, sn_options, lo_options
+
+
+def selected_filters(company_names, industries, range_employees, state_names, localities, years=None,
+                     employees=None):
+    """
+    Normalize the dropdowns and sliders selected values to the params used by the filters
+    :param company_names: Company names selected value
+    :param industries: Industries selected value
+    :param range_employees: Employees ranges selected value (labels, e.g. 1-50)
+    :param state_names: State names selected value
+    :param localities: Localities selected value
+    :param years: Founded year slider value (first and last year)
+    :param employees: Employees slider value (first and last step, see employees_marks)
+    :return: Tuple with company names, industries, employees ranges, state names, localities and founded year
+             range (None for all)
+    """
+    ranges_values = {
+        '1-50': (1, 50),
+        '51-200': (51, 200),
+        '201-500': (201, 500),
+        '501-1000': (501, 1000),
+        '100-5000': (1001, 5000),
+        '5001-10000': (5001, 10000),
+        '10001+': (10001, math.inf),
+    }
+
+    # Prevent empty lists
+    if company_names is not None and len(company_names) == 0:
+        company_names = None
+    if industries is not None and len(industries) == 0:
+        industries = None
+    if state_names is not None and len(state_names) == 0:
+        state_names = None
+    if localities is not None and len(localities) == 0:
+        localities = None
+
+    # Set employees ranges
+    employees_ranges = []
+    if range_employees is None or len(range_employees) == 0:
+        employees_ranges = None
+    else:
+        for range_name in range_employees:
+            employees_ranges.append(ranges_values[range_name])
+
+    # Intersect the employees ranges with the employees slider range (the first step includes 0 employees)
+    if employees is not None and (employees[0] > 0 or employees[1] < len(employees_marks)):
+        low = 0 if employees[0] == 0 else employees_marks[employees[0]] + 1
+        high = math.inf if employees[1] >= len(employees_marks) else employees_marks[employees[1]]
+        employees_ranges = [
+            (max(low, employees_range[0]), min(high, employees_range[1]))
+            for employees_range in employees_ranges or [(0, math.inf)]
+        ]
+
+    # Founded year range (all the companies, even without founded year, when the slider is not used)
+    year_range = None
+    year_bounds = current_data().year_bounds
+    if years is not None and (years[0] > year_bounds[0] or years[1] < year_bounds[1]):
+        year_range = (years[0], years[1])
+
+    return company_names, industries, employees_ranges, state_names, localities, year_range
+
+
+@app.callback(
+    [
+        Output('left-chart', 'figure'),
+        Output('right-chart', 'figure'),
+        Output('map', 'figure'),
+        Output('top-10-companies', 'children'),
+        Output('modal-title', 'children'),
+        # Update dropdown options
+        Output('industries_dropdown', 'options'),
+        Output('range_employees_dropdown', 'options'),
+        Output('states_dropdown', 'options'),
+        Output('localities_dropdown', 'options'),
+        Output('exact-pending', 'data'),
+    ],
+    [
+        Input('company_names_dropdown', 'value'),
+        Input('industries_dropdown', 'value'),
+        Input('range_employees_dropdown', 'value'),
+        Input('states_dropdown', 'value'),
+        Input('localities_dropdown', 'value'),
+        Input('map', 'selectedData'),
+        Input('left-chart', 'selectedData'),
+        Input('years_slider', 'value'),
+        Input('employees_slider', 'value'),
+        Input('exact-timer', 'n_clicks'),
+    ],
+    [State('url', 'pathname')]
+)
+@sector_callback
+def update_graphs(company_names, industries, range_employees, state_names, localities, map_event,
+                  left_chart_event, years, employees, exact_ticks):
+    # Default selected points
+    map_points = None
+    left_chart_point = None
+    # Set soft filters from graphs selections
+    soft_filters = {
+        'State': None,
+        'Year founded': None,
+        'Industry': None,
+    }
+    # Append selected map points
+    if map_event is not None:
+        # Append selected points
+        map_points = []
+
+        for point in map_event['points']:
+            map_points.append(point['pointNumber'])
+            soft_filters['State'] = point['customdata']
+    # Set selected point
+    if left_chart_event is not None:
+        left_chart_point = left_chart_event['points'][0]
+        soft_filters['Year founded'] = left_chart_event['points'][0]['customdata'][0]
+        soft_filters['Industry'] = left_chart_event['points'][0]['customdata'][1]
+
+    company_names, industries, employees_ranges, state_names, localities, year_range = \
+        selected_filters(company_names, industries, range_employees, state_names, localities, years, employees)
+
+    # Drop the selected point when it is out of the business foundation chart (e.g. the years slider was moved
+    # past its year)
+    if left_chart_point is not None:
+        window = year_range or foundation_years
+        if not window[0] <= soft_filters['Year founded'] <= window[1] or \
+                soft_filters['Industry'] not in current_data().top_industries:
+            left_chart_point = None
+            soft_filters['Year founded'] = None
+            soft_filters['Industry'] = None
+
+    # Format modal title for tabs
+    industries_label = 'All'
+    if industries is not None:
+        industries_label = ', '.join(industries)
+
+    modal_title = 'Top 10 companies {}'.format(industries_label)
+
+    # Update dropdown global values
+    current_sector().dropdown_values = (industries, employees_ranges, state_names, localities)
+
+    # Dropdown options updated, the options don't depend on the sliders (and the exact timer only fires after
+    # a response that already had the options)
+    triggered = [trigger['prop_id'] for trigger in dash.callback_context.triggered]
+    if all(trigger in options_unchanged_triggers for trigger in triggered):
+        in_options = er_options = sn_options = lo_options = dash.no_update
+    else:
+        in_options, er_options, sn_options, lo_options = update_dropdowns(company_names, industries,
+                                                                          employees_ranges, state_names, localities)
+
+    # While the user is interacting the map and the business foundation chart are estimated from the sample
+    # (sectors with sample), the exact timer fires when the user stops and the exact results are computed
+    approximate = current_data().sample is not None and \
+        any(trigger not in ('.', 'exact-timer.n_clicks') for trigger in triggered)
+
+    # While a slider is dragged the density tiles leave the sliders ranges out: every step would be a new tiles
+    # URL, and every tile a scan of the companies. The tiles without the sliders are cached (browser and server)
+    # and the exact timer refreshes them when the user stops
+    tiles_ranges = None
+    if any(trigger in ('years_slider.value', 'employees_slider.value') for trigger in triggered):
+        _, _, tiles_employees_ranges, _, _, tiles_year_range = selected_filters(
+            company_names, industries, range_employees, state_names, localities, None, None)
+        tiles_ranges = (tiles_employees_ranges, tiles_year_range)
+        if tiles_ranges == (employees_ranges, year_range):
+            tiles_ranges = None
+
+    left_chart = business_foundation_chart(employees_ranges, state_names, localities, left_chart_point, soft_filters,
+                                           year_range, approximate)
+    states_map = companies_states_map(company_names, industries, employees_ranges, state_names, localities,
+                                      map_points, soft_filters, year_range, approximate, tiles_ranges)
+    # The exact timer only runs when a chart was estimated or the tiles left the sliders out (the range counts
+    # path is already exact), every response restarts it (the time tags the response) and the responses without
+    # estimates cancel it
+    exact_pending = None
+    if left_chart.layout.meta['approximate'] or states_map.layout.meta['approximate'] or tiles_ranges is not None:
+        exact_pending = {'delay': exact_delay, 'response': time.time()}
+    # The top 10 is shared by the biggest companies chart and the modal tabs
+    biggest_companies = get_top10_biggest_companies(industries, employees_ranges, state_names, localities,
+                                                    soft_filters, year_range)
+
+    return \
+        left_chart, \
+        biggest_companies_chart(industries, employees_ranges, state_names, localities, soft_filters, year_range,
+                                biggest_companies), \
+        states_map, \
+        top_10_companies_tabs(industries, employees_ranges, state_names, localities, soft_filters, year_range,
+                              biggest_companies), \
+        modal_title, in_options, er_options, sn_options, lo_options, exact_pending
+
+
+def split_filter_part(filter_part):
+    """
+    Split a part of the table filter query (e.g. {Year founded} > 2000)
+    :param filter_part: Filter part
+    :return: Tuple with the column, the operator and the value (None when the part is not valid)
+    """
+    # The operator is the first token after the column name (the value may contain operator words)
+    filter_part = filter_part.strip()
+    name_end = filter_part.find('}')
+    if not filter_part.startswith('{') or name_end < 0:
+        return None, None, None
+
+    name = filter_part[1:name_end]
+    operator_part = filter_part[name_end + 1:].lstrip()
+
+    for operator_type in table_filter_operators:
+        for operator in operator_type:
+            if not operator_part.startswith(operator):
+                continue
+
+            value_part = operator_part[len(operator):].strip()
+
+            # Quoted values are strings, otherwise try to use a number
+            if len(value_part) > 1 and value_part[0] == value_part[-1] and value_part[0] in ('"', "'", '`'):
+                value = value_part[1:-1].replace('\\' + value_part[0], value_part[0])
+            else:
+                try:
+                    value = float(value_part)
+                except ValueError:
+                    value = value_part
+
+            return name, operator_type[0].strip(), value
+
+    return None, None, None
+
+
+def table_column(rows, column):
+    """
+    Get a column of the companies table
+    :param rows: Company rows
+    :param column: Column name
+    :return: Series with the column values
+    """
+    if column == 'State':
+        return pd.Series(state_table.name.take(rows['State id']), index=rows.index)
+
+    return rows[column]
+
+
+def filter_table_rows(rows, filter_query):
+    """
+    Filter rows with the companies table filter query
+    :param rows: Company rows
+    :param filter_query: Filter query (parts joined by &&)
+    :return: Filtered rows
+    """
+    if not filter_query:
+        return rows
+
+    for filter_part in filter_query.split(' && '):
+        column, operator, value = split_filter_part(filter_part)
+
+        # Ignore invalid parts and unknown columns
+        if column not in table_columns:
+            continue
+
+        values = table_column(rows, column)
+        if operator == 'contains':
+            rows = rows[values.astype(str).str.contains(str(value), case=False, regex=False, na=False)]
+        elif column in table_numeric_columns and not isinstance(value, float):
+            # Numeric columns only can be compared with numbers
+            rows = rows.iloc[0:0]
+        elif operator == 'eq':
+            rows = rows[values == value]
+        elif operator == 'ne':
+            rows = rows[values != value]
+        elif operator == 'lt':
+            rows = rows[values < value]
+        elif operator == 'le':
+            rows = rows[values <= value]
+        elif operator == 'gt':
+            rows = rows[values > value]
+        elif operator == 'ge':
+            rows = rows[values >= value]
+
+    return rows
+
+
+def companies_table_page(company_names, industries, employees_ranges, name_states, locality_names, page_current,
+                         page_size, sort_by, filter_query, year_range=None):
+    """
+    Get a page of the companies table, only the visible rows are formatted
+    :param company_names: Iterable with company names or None for all
+    :param industries: Iterable with industries or None for all
+    :param employees_ranges: Tuple with ranges or None for all (e.g. (1, 50))
+    :param name_states: Iterable with the state or None for all
+    :param locality_names: Iterable with the localities or None for all
+    :param page_current: Page number (starts at 0)
+    :param page_size: Rows by page
+    :param sort_by: Table sort (list of dicts with column_id and direction)
+    :param filter_query: Table filter query
+    :param year_range: Tuple with the first and last founded year or None for all
+    :return: Tuple with the page rows (records), the number of pages and the current page (the last page when
+             the page number is past the filtered rows)
+    """
+    rows = current_data().companies
+
+    # Filter rows
+    rows = filter_company_rows(rows, industries, employees_ranges, name_states, locality_names, year_range)
+    # Filter by company names
+    if company_names is not None:
+        rows = rows[rows['Name'].isin(company_names)]
+    # Filter by table filter query
+    rows = filter_table_rows(rows, filter_query)
+
+    # Sort rows
+    sort_by = [sort for sort in sort_by or [] if sort['column_id'] in table_columns]
+    if len(sort_by) > 0:
+        sort_keys = pd.DataFrame({sort['column_id']: table_column(rows, sort['column_id']) for sort in sort_by})
+        order = sort_keys.sort_values(
+            by=[sort['column_id'] for sort in sort_by],
+            ascending=[sort['direction'] == 'asc' for sort in sort_by],
+            kind='mergesort',
+        ).index
+
+    page_count = max(math.ceil(len(rows) / page_size), 1)
+    page_current = min(page_current, page_count - 1)
+    page = slice(page_current * page_size, (page_current + 1) * page_size)
+    # Only the rows of the page are taken in the sort order (not the whole filtered frame)
+    page_rows = rows.loc[order[page]] if len(sort_by) > 0 else rows.iloc[page]
+
+    # Format only the visible rows
+    records = pd.DataFrame({column: table_column(page_rows, column) for column in table_columns})
+
+    return records.to_dict('records'), page_count, page_current
+
+
+# Restart the exact timer on every response with approximate results (see assets/script.js)
+app.clientside_callback(
+    dash.dependencies.ClientsideFunction(namespace='exactTimer', function_name='restart'),
+    Output('exact-scheduled', 'data'),
+    [Input('exact-pending', 'data')]
+)
+
+
+# Open the top 10 companies modal on the browser (see assets/script.js)
+app.clientside_callback(
+    dash.dependencies.ClientsideFunction(namespace='topCompanies', function_name='openModal'),
+    Output('top-companies-opened', 'data'),
+    [Input('top-companies', 'n_clicks')]
+)
+
+
+# Update the download links with the current selection on the browser (see assets/script.js)
+app.clientside_callback(
+    dash.dependencies.ClientsideFunction(namespace='download', function_name='companiesUrls'),
+    [
+        Output('download-csv', 'href'),
+        Output('download-parquet', 'href'),
+    ],
+    [
+        Input('company_names_dropdown', 'value'),
+        Input('industries_dropdown', 'value'),
+        Input('range_employees_dropdown', 'value'),
+        Input('states_dropdown', 'value'),
+        Input('localities_dropdown', 'value'),
+        Input('map', 'selectedData'),
+        Input('left-chart', 'selectedData'),
+        Input('years_slider', 'value'),
+        Input('employees_slider', 'value'),
+    ],
+    [State('url', 'pathname')]
+)
+
+
+@app.callback(
+    [
+        Output('companies-table', 'data'),
+        Output('companies-table', 'page_count'),
+        Output('companies-table', 'page_current'),
+    ],
+    [
+        Input('companies-table', 'page_current'),
+        Input('companies-table', 'page_size'),
+        Input('companies-table', 'sort_by'),
+        Input('companies-table', 'filter_query'),
+        Input('company_names_dropdown', 'value'),
+        Input('industries_dropdown', 'value'),
+        Input('range_employees_dropdown', 'value'),
+        Input('states_dropdown', 'value'),
+        Input('localities_dropdown', 'value'),
+        Input('years_slider', 'value'),
+        Input('employees_slider', 'value'),
+    ],
+    [State('url', 'pathname')]
+)
+@sector_callback
+def update_companies_table(page_current, page_size, sort_by, filter_query, company_names, industries,
+                           range_employees, state_names, localities, years, employees):
+    """
+    Listen table (paging, sorting and filtering), dropdowns and sliders changes.
+    The table still scans the companies while a slider is dragged: the number of pages needs the exact count of
+    the rows that pass the table filter query, which the range counts don't answer
+    :return: Page rows, number of pages and current page
+    """
+    company_names, industries, employees_ranges, state_names, localities, year_range = \
+        selected_filters(company_names, industries, range_employees, state_names, localities, years, employees)
+
+    # Go to the first page when the filters changed (dropdowns, sliders or the table filter)
+    triggered = [trigger['prop_id'] for trigger in dash.callback_context.triggered]
+    if page_current is None or 'companies-table.filter_query' in triggered or \
+            not any(trigger.startswith('companies-table.') for trigger in triggered):
+        page_current = 0
+
+    records, page_count, page_current = companies_table_page(company_names, industries, employees_ranges, state_names,
+                                               localities, page_current, page_size, sort_by, filter_query,
+                                               year_range)
+
+    return records, page_count, page_current
+
+
+def download_chunks(companies, selection, size=downloads.chunk_size):
+    """
+    Filter the companies of a download chunk by chunk (only a chunk of the result is in memory)
+    :param companies: Companies data frame (of the pinned version)
+    :param selection: Tuple with company names, industries, employees ranges, state names, localities, founded
+                      year range (see selected_filters) and the soft filter
+    :param size: Rows by chunk
+    :return: Generator of data frames with the filtered companies (the state id is replaced by the state code)
+    """
+    company_names, industries, employees_ranges, state_names, localities, year_range, soft_filter = selection
+
+    for start in range(0, len(companies), size):
+        rows = filter_company_rows(companies.iloc[start:start + size], industries, employees_ranges, state_names,
+                                   localities, year_range)
+        # Filter by company names
+        if company_names is not None:
+            rows = rows[rows['Name'].isin(company_names)]
+        # Apply soft filter
+        if soft_filter['State'] is not None:
+            rows = rows[rows['State id'] == soft_filter['State']]
+        if soft_filter['Year founded'] is not None:
+            rows = rows[rows['Year founded'] == soft_filter['Year founded']]
+        if soft_filter['Industry'] is not None:
+            rows = rows[rows['Industry'] == soft_filter['Industry']]
+
+        # Same columns as the companies workbook
+        rows = rows.copy()
+        rows.insert(rows.columns.get_loc('State id'), 'State', state_table.code.take(rows['State id']))
+
+        yield rows.drop(columns=['State id'])
+
+
+def download_stream(chunks, file_format):
+    """
+    Write the download
+    :param chunks: Data frames with the filtered companies
+    :param file_format: File format (csv or parquet)
+    :return: Generator with the file content
+    """
+    if file_format == 'parquet':
+        return downloads.parquet_stream(chunks)
+
+    return downloads.csv_stream(chunks)
+
+
+@server.route('/download/<sector_name>/companies.<file_format>')
+def download_companies(sector_name, file_format):
+    """
+    Download the companies of the current selection (the inputs of update_graphs, see the download links)
+    :param sector_name: Sector name
+    :param file_format: File format (csv or parquet)
+    :return: Streamed response
+    """
+    sector = sectors.get('/' + sector_name)
+    if sector is None or file_format not in downloads.formats:
+        abort(404)
+    if not downloads.slots.acquire(blocking=False):
+        abort(429)
+
+    try:
+        selection = json.loads(request.args.get('selection', '{}'))
+        with sector_context(sector) as current:
+            filters = selected_filters(selection.get('company_names'), selection.get('industries'),
+                                       selection.get('range_employees'), selection.get('state_names'),
+                                       selection.get('localities'), selection.get('years'),
+                                       selection.get('employees'))
+        filters += ({
+            'State': selection.get('state'),
+            'Year founded': selection.get('year'),
+            'Industry': selection.get('industry'),
+        },)
+
+        # The size is checked before the download starts (the chunks are filtered again while they are written)
+        rows_count = sum(len(rows) for rows in download_chunks(current.companies, filters))
+    except (ValueError, TypeError, KeyError, AttributeError):
+        downloads.slots.release()
+        abort(400)
+    except BaseException:
+        downloads.slots.release()
+        raise
+
+    if rows_count > downloads.max_rows:
+        downloads.slots.release()
+        abort(413, 'The download has {} companies, the max is {}'.format(rows_count, downloads.max_rows))
+
+    # The version was pinned, the download uses the same companies even if the dataset is reloaded
+    response = Response(download_stream(download_chunks(current.companies, filters), file_format),
+                        mimetype=downloads.formats[file_format], headers={
+                            'Content-Disposition': 'attachment; filename={}-companies.{}'.format(sector_name,
+                                                                                               file_format),
+                        })
+    # The server closes the response when the download ends, the client disconnects or the body is not sent
+    # (HEAD requests), even if the generator was never started
+    response.call_on_close(downloads.slots.release)
+
+    return response
+
+
+@functools.lru_cache(maxsize=32)
+def page_layout(sector_name, version):
+    """
+    Create the sector page, the page is built once by sector and data version
+    :param sector_name: Sector name (must be the sector of the request)
+    :param version: Data version (must be the pinned version)
+    :return: HTML elements
+    """
+    return html.Div(className='row card', children=[
+        html.Div(className='card-content', children=[
+            html.Div(className='col s12', children=[
+                html.Span(className='card-title', children=current_sector().title),
+            ]),
+            # Select element to filtering data
+            html.Div(className='row', children=[
+                html.Div(className='col s12', children=[
+                    dcc.Input(
+                        id='company_name_input',
+                        type='text',
+                        placeholder='Search by name of the company',
+                        autoComplete='off',
+                    ),
+                    dcc.Dropdown(
+                        options=[],
+                        id='company_names_dropdown',
+                        placeholder='All companies are selected',
+                        multi=True,
+                    ),
+                ]),
+            ]),
+            html.Div(className='row', children=[
+                html.Div(className='col s3', children=[
+                    industries_dropdown(),
+                ]),
+                html.Div(className='col s3', children=[
+                    range_employees_dropdown(),
+                ]),
+                html.Div(className='col s3', children=[
+                    states_dropdown(),
+                ]),
+                html.Div(className='col s3', children=[
+                    localities_dropdown(),
+                ]),
+            ]),
+            html.Div(className='row', children=[
+                html.Div(className='col s6', children=[
+                    html.Span('Founded year'),
+                    years_slider(),
+                ]),
+                html.Div(className='col s6', children=[
+                    html.Span('Number of employees'),
+                    employees_slider(),
+                ]),
+            ]),
+            html.Div(className='col s12', children=[
+                # Insert map on the HTML page
+                dcc.Graph(
+                    id='map',
+                    figure=companies_states_map(None, None, None, None, None, None, None),
+                ),
+                # Clicked by a client-side timer once the user stops interacting, when the charts show
+                # approximate results (see assets/script.js)
+                dcc.Store(id='exact-pending'),
+                dcc.Store(id='exact-scheduled'),
+                html.Button(id='exact-timer', style={'display': 'none'}),
+            ]),
+            html.Div(className='col s8', children=[
+                html.P(
+                    className='descriptive-text',
+                    children=[
+                        html.Span(
+                            'The size of the circles indicates the number of companies in the state, the larger the '
+                            'circle the more companies there are.'),
+                        html.Br(),
+                        html.Span(
+                            'While the color indicates: in red a low number of employees and in dark green a high number '
+                            'of employees per company.')
+                    ],
+                ),
+            ]),
+            html.Div(className='col s4 center-align', children=[
+                # The modal is opened by a client-side callback (see assets/script.js)
+                html.Button(
+                    id='top-companies',
+                    className='btn blue darken-4 waves-effect',
+                    children='Read more about Top 10 companies',
+                ),
+                dcc.Store(id='top-companies-opened'),
+                html.Div(id='modal1', className='modal', children=[
+                    html.Div(className='modal-content', children=[
+                        html.H4(id='modal-title', children='Top 10 companies All'),
+                        html.Div(id='top-10-companies', children=top_10_companies_tabs(None, None, None, None, None)),
+                    ]),
+                ]),
+            ]),
+            html.Div(className='col s8', children=[
+                dcc.Graph(id='left-chart', figure=business_foundation_chart(None, None, None, None, None))
+            ]),
+            html.Div(className='col s4', children=[
+                dcc.Graph(id='right-chart', figure=biggest_companies_chart(None, None, None, None, None))
+            ]),
+            html.Div(className='col s12 right-align', children=[
+                # The download links are updated by a client-side callback (see assets/script.js)
+                html.A(id='download-csv', className='btn-flat waves-effect', children='Download CSV',
+                       href='', download=''),
+                html.A(id='download-parquet', className='btn-flat waves-effect', children='Download Parquet',
+                       href='', download=''),
+            ]),
+            html.Div(className='col s12', children=[
+                # Companies table, the rows are paged, sorted and filtered on the server
+                dash_table.DataTable(
+                    id='companies-table',
+                    columns=[
+                        {'name': column, 'id': column, 'type': 'numeric' if column in table_numeric_columns else 'text'}
+                        for column in table_columns
+                    ],
+                    page_current=0,
+                    page_size=20,
+                    page_action='custom',
+                    sort_action='custom',
+                    sort_mode='multi',
+                    sort_by=[],
+                    filter_action='custom',
+                    filter_query='',
+                ),
+            ]),
+        ]),
+    ])
+
@@ -0,0 +1,201 @@
+import collections
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from flask import Response, abort, g, jsonify, request
+
+"""
+Callbacks profiling.
+When it is enabled (CALLBACK_PROFILING=1), the callback requests with the X-Profile header (or a sample of
+the requests, CALLBACK_PROFILING_SAMPLE=0.01) are profiled with a sampling profiler. The profiles are stored
+by callback and inputs, and they can be listed and downloaded as folded stacks (flamegraph.pl, speedscope).
+When it is disabled nothing is installed on the server.
+"""
+dirname = os.path.dirname(__file__)
+# Profiles directory (shared by all the workers)
+profiles_dirname = os.path.join(dirname, 'cache', 'profiles')
+# Seconds between every stack sample
+sample_interval = 0.002
+# Max profiles stored (the oldest profiles are removed)
+max_profiles = 200
+# Dash path of the callback requests
+callback_path = '/_dash-update-component'
+
+
+class StackSampler:
+    """
+    Sampling profiler of a single thread, the stacks are read from another thread
+    """
+
+    def __init__(self, thread_id, interval=sample_interval):
+        """
+        :param thread_id: Id of the profiled thread
+        :param interval: Seconds between samples
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+
+            while frame is not None:
+                code = frame.f_code
+                stack.append('{} ({}:{})'.format(code.co_name, os.path.basename(code.co_filename),
+                                                 code.co_firstlineno))
+                frame = frame.f_back
+
+            if len(stack) > 0:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def folded(self):
+        """
+        Format the stacks as folded stacks (one line by stack: frames separated by ; and the samples)
+        :return: Folded stacks text
+        """
+        return '\n'.join('{} {}'.format(';'.join(stack), count) for stack, count in self.stacks.most_common())
+
+
+def profile_key(callback, inputs):
+    """
+    Create the key of a profile, the inputs are normalized so the same selection always has the same key
+    :param callback: Callback outputs (e.g. ..left-chart.figure...map.figure..)
+    :param inputs: Callback inputs
+    :return: Key (hex string)
+    """
+    normalized = json.dumps([callback, sorted(inputs or [], key=lambda item: (item.get('id'), item.get('property')))],
+                            sort_keys=True, default=str)
+
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def store_profile(key, callback, inputs, duration, sampler):
+    """
+    Write a profile on the profiles directory
+    :param key: Profile key
+    :param callback: Callback outputs
+    :param inputs: Callback inputs
+    :param duration: Seconds of the request
+    :param sampler: Stack sampler
+    :return: None
+    """
+    os.makedirs(profiles_dirname, exist_ok=True)
+
+    with open(os.path.join(profiles_dirname, key + '.folded'), 'w') as folded_file:
+        folded_file.write(sampler.folded())
+    with open(os.path.join(profiles_dirname, key + '.json'), 'w') as metadata_file:
+        json.dump({
+            'id': key,
+            'callback': callback,
+            'inputs': inputs,
+            'duration': duration,
+            'samples': sum(sampler.stacks.values()),
+            'created': time.time(),
+            'pid': os.getpid(),
+        }, metadata_file, default=str)
+
+    # Remove the oldest profiles
+    metadata_files = sorted(
+        (name for name in os.listdir(profiles_dirname) if name.endswith('.json')),
+        key=lambda name: os.path.getmtime(os.path.join(profiles_dirname, name)))
+    for name in metadata_files[:-max_profiles]:
+        for extension in ('.json', '.folded'):
+            try:
+                os.remove(os.path.join(profiles_dirname, name[:-len('.json')] + extension))
+            except OSError:
+                pass
+
+
+def list_profiles():
+    """
+    Read the metadata of the stored profiles
+    :return: List of dicts (newest first)
+    """
+    profiles = []
+
+    if os.path.isdir(profiles_dirname):
+        for name in os.listdir(profiles_dirname):
+            if name.endswith('.json'):
+                try:
+                    with open(os.path.join(profiles_dirname, name)) as metadata_file:
+                        profiles.append(json.load(metadata_file))
+                except (OSError, ValueError):
+                    continue
+
+    return sorted(profiles, key=lambda profile: profile['created'], reverse=True)
+
+
+def install(server):
+    """
+    Install the profiling hooks and endpoints on the server when the profiling is enabled
+    :param server: Flask server
+    :return: None
+    """
+    if os.environ.get('CALLBACK_PROFILING', '0') != '1':
+        return
+
+    sample_rate = float(os.environ.get('CALLBACK_PROFILING_SAMPLE', '0'))
+
+    @server.before_request
+    def start_profile():
+        if request.path != callback_path:
+            return
+        if request.headers.get('X-Profile') is None and random.random() >= sample_rate:
+            return
+
+        g.profile_sampler = StackSampler(threading.get_ident())
+        g.profile_start = time.perf_counter()
+        g.profile_sampler.start()
+
+    @server.after_request
+    def stop_profile(response):
+        sampler = g.pop('profile_sampler', None)
+        if sampler is None:
+            return response
+
+        sampler.stop()
+        body = request.get_json(silent=True) or {}
+        key = profile_key(body.get('output'), body.get('inputs'))
+        store_profile(key, body.get('output'), body.get('inputs'), time.perf_counter() - g.profile_start, sampler)
+        response.headers['X-Profile-Id'] = key
+
+        return response
+
+    @server.route('/_profiles')
+    def profiles():
+        """
+        List the profiles
+        :return: JSON response
+        """
+        return jsonify(list_profiles())
+
+    @server.route('/_profiles/<key>.folded')
+    def profile(key):
+        """
+        Download a profile as folded stacks
+        :param key: Profile key
+        :return: Text response
+        """
+        path = os.path.join(profiles_dirname, key + '.folded')
+        if not key.isalnum() or not os.path.exists(path):
+            abort(404)
+
+        with open(path) as folded_file:
+            return Response(folded_file.read(), mimetype='text/plain', headers={
+                'Content-Disposition': 'attachment; filename={}.folded'.format(key),
+            })
@@ -0,0 +1,119 @@
+import math
+import numpy as np
+
+"""
+Range counts.
+The companies are counted (and their employees summed) by group (e.g. state and industry), founded year and
+employees bin. The (group, year) cells are sorted and stored as prefix sums, so the totals of every group for
+any founded year range are two lookups by group and no company row is scanned. The employees bins are the
+steps of the employees slider (and the employees ranges of the dropdown use the same edges), so the employees
+ranges are answered exactly by summing bins.
+"""
+
+
+class RangeCounts:
+    """
+    Prefix sums of the companies and employees by group, founded year and employees bin
+    """
+
+    def __init__(self, groups, group_count, years, employees, employees_edges):
+        """
+        :param groups: Array with the group (integer from 0) of every company
+        :param group_count: Number of groups
+        :param years: Array with the founded year of every company
+        :param employees: Array with the employees of every company
+        :param employees_edges: Sorted employees edges, the bins are (edge, next edge] (and 0 employees)
+        """
+        self.group_count = group_count
+        self.employees_edges = np.asarray(employees_edges)
+        # Employees bins: 0 (up to the first edge), one by edge and the last one (more than the last edge)
+        self.bins = len(self.employees_edges) + 1
+        # Years with companies (year bins)
+        self.years = np.unique(years)
+
+        year_bins = np.searchsorted(self.years, years)
+        employees_bins = np.searchsorted(self.employees_edges, employees, side='left')
+        # Sorted (group, year) cells with companies
+        self.keys, cells = np.unique(np.asarray(groups, dtype=np.int64) * len(self.years) + year_bins,
+                                     return_inverse=True)
+        cell_bins = cells * self.bins + employees_bins
+
+        counts = np.bincount(cell_bins, minlength=len(self.keys) * self.bins).reshape(-1, self.bins)
+        sums = np.bincount(cell_bins, weights=np.asarray(employees, dtype=float),
+                           minlength=len(self.keys) * self.bins).reshape(-1, self.bins)
+        # Prefix sums by cell (the first row is 0)
+        self.counts = np.concatenate((np.zeros((1, self.bins), dtype=np.int64), np.cumsum(counts, axis=0)))
+        self.sums = np.concatenate((np.zeros((1, self.bins)), np.cumsum(sums, axis=0)))
+
+    def year_bins(self, year_range):
+        """
+        Get the year bins of a founded year range
+        :param year_range: Tuple with the first and last year (inclusive) or None for all
+        :return: Tuple with the first and the last (exclusive) year bin
+        """
+        if year_range is None:
+            return 0, len(self.years)
+
+        first_bin = np.searchsorted(self.years, year_range[0], side='left')
+
+        # An empty range (the last year before the first year) has no bins
+        return first_bin, max(first_bin, np.searchsorted(self.years, year_range[1], side='right'))
+
+    def aligned(self, employees_ranges):
+        """
+        Check if the employees ranges can be answered with the bins (the ranges start and end on the edges)
+        :param employees_ranges: Iterable with the employees ranges (inclusive) or None for all
+        :return: Boolean
+        """
+        for low, high in employees_ranges or []:
+            first = np.searchsorted(self.employees_edges, low, side='left')
+            last = np.searchsorted(self.employees_edges, high, side='left')
+            if low > 0 and (first == 0 or self.employees_edges[first - 1] + 1 != low):
+                return False
+            if not (math.isinf(high) or (last < len(self.employees_edges) and self.employees_edges[last] == high)):
+                return False
+
+        return True
+
+    def employees_bins(self, employees_ranges):
+        """
+        Get the employees bins of the employees ranges (must be aligned)
+        :param employees_ranges: Iterable with the employees ranges (inclusive) or None for all
+        :return: Boolean array by bin
+        """
+        if employees_ranges is None:
+            return np.ones(self.bins, dtype=bool)
+
+        selected = np.zeros(self.bins, dtype=bool)
+        for low, high in employees_ranges:
+            if low <= high:
+                selected[np.searchsorted(self.employees_edges, low, side='left'):
+                         np.searchsorted(self.employees_edges, high, side='left') + 1] = True
+
+        return selected
+
+    def totals(self, year_range):
+        """
+        Get the companies and employees of every group in a founded year range
+        :param year_range: Tuple with the first and last year (inclusive) or None for all
+        :return: Tuple with the companies and the employees by group and employees bin
+        """
+        first_bin, last_bin = self.year_bins(year_range)
+        groups = np.arange(self.group_count, dtype=np.int64) * len(self.years)
+        starts = np.searchsorted(self.keys, groups + first_bin)
+        ends = np.searchsorted(self.keys, groups + last_bin)
+
+        return self.counts[ends] - self.counts[starts], self.sums[ends] - self.sums[starts]
+
+    def cells(self, year_range):
+        """
+        Get the companies of the (group, year) cells in a founded year range
+        :param year_range: Tuple with the first and last year (inclusive) or None for all
+        :return: Tuple with the group, the year and the companies by employees bin of every cell
+        """
+        first_bin, last_bin = self.year_bins(year_range)
+        year_bins = self.keys % len(self.years)
+        selected = np.flatnonzero((year_bins >= first_bin) & (year_bins < last_bin))
+
+        return self.keys[selected] // len(self.years), self.years[year_bins[selected]], \
+            self.counts[selected + 1] - self.counts[selected]
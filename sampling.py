@@ -0,0 +1,75 @@
+import numpy as np
+
+"""
+Stratified sampling.
+A sample of the companies is drawn once by data version, stratified by state and industry, so every stratum
+is represented even when it is small. The counts and sums of any filter are estimated from the sample rows
+with the weight of their stratum (stratum companies / stratum sampled companies), and the error bound of the
+counts is the half width of the confidence interval of the stratified estimator.
+"""
+# Companies sampled at least by stratum (or all the stratum companies when there are fewer)
+min_stratum_sample = 30
+# Normal quantile of the confidence interval of the error bounds (95%)
+confidence_quantile = 1.96
+
+
+def stratified_rows(strata, size, seed=0):
+    """
+    Draw a stratified sample: the sample size is allocated in proportion to the stratum sizes
+    :param strata: Array with the stratum (integer from 0) of every row
+    :param size: Sample size (approximate, the small strata are sampled with min_stratum_sample rows)
+    :param seed: Random seed
+    :return: Tuple with the sorted sampled row positions, the rows by stratum and the sampled rows by stratum
+    """
+    strata = np.asarray(strata)
+    population = np.bincount(strata)
+    sampled = np.minimum(population, np.maximum(np.round(population * size / len(strata)), min_stratum_sample))
+    sampled = sampled.astype(np.int64)
+
+    # Sort the rows by stratum and random key, the first rows of every stratum are the sample
+    keys = np.random.default_rng(seed).random(len(strata))
+    order = np.lexsort((keys, strata))
+    starts = np.concatenate(([0], np.cumsum(population)[:-1]))
+    ranks = np.arange(len(strata)) - starts[strata[order]]
+    rows = np.sort(order[ranks < sampled[strata[order]]])
+
+    return rows, population, sampled
+
+
+def row_weights(strata, population, sampled):
+    """
+    Get the weight of the sampled rows (companies represented by every row)
+    :param strata: Array with the stratum of the sampled rows
+    :param population: Rows by stratum
+    :param sampled: Sampled rows by stratum
+    :return: Array with the weights
+    """
+    return population[strata] / sampled[strata]
+
+
+def estimate_counts(strata, groups, group_count, population, sampled):
+    """
+    Estimate the number of companies by group and the error bound of the estimates
+    :param strata: Array with the stratum of the sampled rows that pass the filters
+    :param groups: Array with the group (integer from 0) of the same rows
+    :param group_count: Number of groups
+    :param population: Rows by stratum
+    :param sampled: Sampled rows by stratum
+    :return: Tuple with the estimated counts and the error bounds by group
+    """
+    strata = np.asarray(strata, dtype=np.int64)
+    groups = np.asarray(groups, dtype=np.int64)
+    strata_count = len(population)
+    # Sampled rows by group and stratum
+    hits = np.bincount(groups * strata_count + strata, minlength=group_count * strata_count)
+    hits = hits.reshape(group_count, strata_count).astype(float)
+
+    population = population.astype(float)
+    sampled = sampled.astype(float)
+    proportions = hits / np.maximum(sampled, 1)
+    # Variance of the estimated count of every stratum (with the finite population correction)
+    variance = population ** 2 * (1 - sampled / np.maximum(population, 1)) * proportions * (1 - proportions) / \
+        np.maximum(sampled - 1, 1)
+
+    return hits @ (population / np.maximum(sampled, 1)), confidence_quantile * np.sqrt(variance.sum(axis=1))
+
@@ -0,0 +1,213 @@
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from gunicorn.app.base import BaseApplication
+
+"""
+Production server.
+Run the dashboard with gunicorn: the application (and the dataset) is loaded once in the master process
+before the workers are forked (preload), so the workers start ready and share the data memory (copy-on-write).
+The callbacks are CPU-bound (pandas), so the concurrency comes from the worker processes and every worker
+only has a few threads to overlap the I/O of the requests.
+
+Send SIGHUP to the master for a graceful restart of the workers. With preload the dataset watcher only runs
+in the master (see dataset.py): it builds the new version once and then restarts the workers gracefully, so
+the new workers are forked with the new version and share it. Use --benchmark to compare the server
+configurations.
+"""
+dirname = os.path.dirname(os.path.abspath(__file__))
+# Default server options (see https://docs.gunicorn.org/en/stable/settings.html)
+default_options = {
+    'bind': '0.0.0.0:8050',
+    'workers': multiprocessing.cpu_count(),
+    'threads': 2,
+    'worker_class': 'gthread',
+    'preload_app': True,
+    'timeout': 120,
+    # Time to finish the running requests on restarts
+    'graceful_timeout': 30,
+    'keepalive': 5,
+    # Recycle the workers to release the memory of the figures
+    'max_requests': 2000,
+    'max_requests_jitter': 200,
+}
+# Server configurations compared by the benchmark
+benchmark_configurations = (
+    {'workers': multiprocessing.cpu_count(), 'threads': 1, 'preload_app': True},
+    {'workers': multiprocessing.cpu_count(), 'threads': 2, 'preload_app': True},
+    {'workers': multiprocessing.cpu_count(), 'threads': 4, 'preload_app': True},
+    {'workers': multiprocessing.cpu_count() * 2, 'threads': 1, 'preload_app': True},
+    {'workers': multiprocessing.cpu_count(), 'threads': 2, 'preload_app': False},
+)
+
+
+class DashboardApplication(BaseApplication):
+    """
+    Gunicorn application that serves the dashboard WSGI application
+    """
+
+    def __init__(self, options):
+        """
+        :param options: Gunicorn options
+        """
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        import dataset
+        from wsgi import application
+
+        # Move the loaded objects to the permanent generation, so the garbage collector of the workers
+        # doesn't write on them (and the memory pages stay shared)
+        gc.freeze()
+
+        if self.cfg.preload_app:
+            # The master reloads the data, then the workers are replaced with workers of the new version
+            dataset.swap_hooks.append(recycle_workers)
+
+        return application
+
+
+def recycle_workers(handle):
+    """
+    Restart the workers gracefully after a new dataset version is active on the master
+    :param handle: Dataset handle with the new version
+    :return: None
+    """
+    gc.freeze()
+    os.kill(os.getpid(), signal.SIGHUP)
+
+
+def memory_usage(pid):
+    """
+    Get the memory used by a process and its children (PSS, the shared memory is divided between processes)
+    :param pid: Process id
+    :return: Memory in MB or None when it is not available (only Linux)
+    """
+    total = 0
+    pids = [pid]
+
+    try:
+        while len(pids) > 0:
+            current = pids.pop()
+            with open('/proc/{}/smaps_rollup'.format(current)) as smaps:
+                for line in smaps:
+                    if line.startswith('Pss:'):
+                        total += int(line.split()[1])
+            with open('/proc/{0}/task/{0}/children'.format(current)) as children:
+                pids.extend(int(child) for child in children.read().split())
+    except OSError:
+        return None
+
+    return total / 1024
+
+
+def wait_ready(url, process, timeout=600):
+    """
+    Wait until the server answers
+    :param url: Server URL
+    :param process: Server process
+    :param timeout: Max seconds to wait
+    :return: Seconds until the server was ready
+    """
+    start = time.perf_counter()
+
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError('The server stopped (exit code {})'.format(process.returncode))
+        try:
+            with urllib.request.urlopen(url, timeout=5):
+                return time.perf_counter() - start
+        except OSError:
+            time.sleep(0.2)
+
+    raise RuntimeError('The server was not ready after {} seconds'.format(timeout))
+
+
+def benchmark(concurrency, duration, port, environment):
+    """
+    Start the server with every benchmark configuration and run the load test against it
+    :param concurrency: Number of virtual users
+    :param duration: Seconds of every load test
+    :param port: Port of the server
+    :param environment: Environment variables of the server
+    :return: Report text
+    """
+    import loadtest
+
+    url = 'http://127.0.0.1:{}'.format(port)
+    lines = ['{:>7} {:>7} {:>7} {:>9} {:>9} {:>9} {:>9} {:>9} {:>7}'.format(
+        'Workers', 'Threads', 'Preload', 'Ready s', 'Memory MB', 'Req/s', 'p50 ms', 'p95 ms', 'Errors')]
+
+    for configuration in benchmark_configurations:
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(dirname, 'serve.py'), '--bind', '127.0.0.1:{}'.format(port),
+             '--options', json.dumps(configuration)],
+            env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            ready = wait_ready(url + '/', process)
+            # Memory after the first requests of every worker
+            totals = loadtest.run(loadtest.HttpClient(url), concurrency, duration).totals()
+            memory = memory_usage(process.pid)
+        finally:
+            process.terminate()
+            process.wait()
+
+        lines.append('{:>7} {:>7} {:>7} {:>9.1f} {:>9} {:>9.1f} {:>9.1f} {:>9.1f} {:>6.1f}%'.format(
+            configuration['workers'], configuration['threads'], 'yes' if configuration['preload_app'] else 'no',
+            ready, '-' if memory is None else '{:.0f}'.format(memory), totals['throughput'],
+            totals['p50'] * 1000, totals['p95'] * 1000, totals['errors'] * 100))
+
+    return '\n'.join(lines)
+
+
+# Run the production server (e.g. python serve.py --workers 4 --threads 2)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the dashboard with gunicorn')
+    parser.add_argument('--bind', default=default_options['bind'], help='address of the server')
+    parser.add_argument('--workers', type=int, default=default_options['workers'], help='number of processes')
+    parser.add_argument('--threads', type=int, default=default_options['threads'], help='threads by process')
+    parser.add_argument('--no-preload', action='store_true', help='load the application on every worker')
+    parser.add_argument('--options', default='{}', help='JSON with other gunicorn options')
+    parser.add_argument('--benchmark', action='store_true', help='compare the server configurations')
+    parser.add_argument('--synthetic', type=int, metavar='ROWS', help='use a synthetic dataset (offline)')
+    parser.add_argument('--concurrency', type=int, default=8, help='virtual users of the benchmark')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of every benchmark load test')
+    arguments = parser.parse_args()
+
+    if arguments.synthetic is not None:
+        import synthetic
+
+        directory = tempfile.mkdtemp(prefix='iota-serve-')
+        os.environ['FOOD_AND_BEVERAGES_SOURCE'] = os.path.join(directory, 'companies.csv')
+        os.environ['US_STATES_GEOJSON'] = os.path.join(directory, 'us-states.json')
+        synthetic.generate_companies(os.environ['FOOD_AND_BEVERAGES_SOURCE'], arguments.synthetic)
+        synthetic.generate_geojson(os.environ['US_STATES_GEOJSON'])
+
+    if arguments.benchmark:
+        print(benchmark(arguments.concurrency, arguments.duration, int(arguments.bind.rsplit(':', 1)[-1]),
+                        dict(os.environ)))
+    else:
+        server_options = dict(default_options)
+        server_options.update({
+            'bind': arguments.bind,
+            'workers': arguments.workers,
+            'threads': arguments.threads,
+            'preload_app': not arguments.no_preload,
+        })
+        server_options.update(json.loads(arguments.options))
+
+        sys.path.insert(0, dirname)
+        DashboardApplication(server_options).run()
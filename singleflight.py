@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Only POSIX systems have file locks (the production server), the calls are shared by thread on other systems
+    fcntl = None
+
+"""
+Single-flight calls.
+Concurrent calls with the same key wait for the computation in progress and share its result (e.g. the users
+that open the dashboard at the same time send the same callback requests). Only the calls that overlap are
+shared, the result is not cached when the computation ends.
+With the lock files the calls of different processes (the gunicorn workers) are shared too: the first process
+computes while it holds the lock file of the key and writes the result file, the other processes wait for the
+lock and read the result written while they were waiting (or compute it when there is no result).
+"""
+dirname = os.path.dirname(os.path.abspath(__file__))
+# Lock and result files shared by the processes
+locks_dirname = os.path.join(dirname, 'cache', 'flights')
+# Seconds the result files are kept (only the processes that were waiting read the results)
+files_ttl = 60
+
+
+def call_key(values):
+    """
+    Create the key of a call, the values are normalized so the same inputs always have the same key
+    :param values: JSON serializable values (e.g. callback name and inputs)
+    :return: Key (hex string)
+    """
+    return hashlib.sha1(json.dumps(values, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class Call:
+    """
+    Computation in progress of a key
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Group of single-flight calls
+    """
+
+    def __init__(self, shared_dirname=None):
+        """
+        :param shared_dirname: Directory of the lock and result files or None to only share the calls of the
+                               threads of the process
+        """
+        self.shared_dirname = shared_dirname
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def do(self, key, function):
+        """
+        Call a function or wait for the call in progress with the same key
+        :param key: Call key (see call_key)
+        :param function: Function without arguments
+        :return: Result of the function (the exception of the function is raised on all the waiting calls)
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+
+            return call.result
+
+        try:
+            if self.shared_dirname is None:
+                call.result = function()
+            else:
+                call.result = self.shared_call(key, function)
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+        return call.result
+
+    def shared_call(self, key, function):
+        """
+        Call a function or read the result of the call in progress of other process.
+        Without file locks (non POSIX systems) the function is called (only the threads share the call)
+        :param key: Call key
+        :param function: Function without arguments
+        :return: Result of the function
+        """
+        if fcntl is None:
+            return function()
+
+        os.makedirs(self.shared_dirname, exist_ok=True)
+        path = os.path.join(self.shared_dirname, key)
+        waiting = time.time()
+
+        with open(path + '.lock', 'a') as lock_file:
+            # The lock is released when the file is closed
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            # Result of other process that ended while this process was waiting
+            try:
+                if os.path.getmtime(path + '.pickle') >= waiting:
+                    with open(path + '.pickle', 'rb') as result_file:
+                        return pickle.load(result_file)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass
+
+            result = function()
+            self.write_result(path + '.pickle', result)
+
+            return result
+
+    def write_result(self, path, result):
+        """
+        Write a result file (replaced at once, so it is never read half written) and remove the old result files
+        :param path: Result file path
+        :param result: Result of the function
+        :return: None
+        """
+        descriptor, temporary = tempfile.mkstemp(dir=self.shared_dirname, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as result_file:
+                pickle.dump(result, result_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, path)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            # The other processes compute the result when it can't be shared
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+
+        now = time.time()
+        for name in os.listdir(self.shared_dirname):
+            # The lock files are kept (other process may hold the lock of an old file, its mtime is not updated)
+            if not name.endswith(('.pickle', '.tmp')):
+                continue
+            try:
+                if now - os.path.getmtime(os.path.join(self.shared_dirname, name)) > files_ttl:
+                    os.remove(os.path.join(self.shared_dirname, name))
+            except OSError:
+                continue
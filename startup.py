@@ -0,0 +1,202 @@
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+"""
+Startup timings.
+The startup phases (imports, states geometry, data load, merges, index build, figure prebuild) are timed when
+the application is loaded, and the timings are printed when it is ready if STARTUP_TIMINGS=1. Only the phases
+of the startup are recorded (not the reloads of the dataset watcher).
+
+Run this module to load the application on a new process (as a new worker does) and print the phase timings
+and the import time profile (python -X importtime). With --budget the exit code is 1 when the process takes
+longer than the budget to be ready, so the startup time can be checked before every deploy. The budget is
+also checked by tests/test_startup.py with a synthetic dataset (pip install -r requirements-dev.txt, then
+python -m pytest tests).
+"""
+dirname = os.path.dirname(os.path.abspath(__file__))
+# Start of the startup (this module is the first one imported by the application)
+started = time.perf_counter()
+# Seconds to be ready of a new process
+default_budget = float(os.environ.get('STARTUP_BUDGET', '20'))
+# Modules of the import time profile
+default_imports = 15
+# Recorded phases (name, depth and seconds) in start order
+phases = []
+# Seconds since the start until the application was ready (None while it is loading)
+total = None
+# Nesting level of the running phase and end of the last top level phase
+depth = 0
+last_end = started
+
+
+@contextlib.contextmanager
+def phase(name):
+    """
+    Time a startup phase (phases can be nested, e.g. the data load of a sector)
+    :param name: Phase name
+    :return: Context manager
+    """
+    global depth, last_end
+
+    if total is not None:
+        yield
+        return
+
+    record = [name, depth, None]
+    phases.append(record)
+    start = time.perf_counter()
+    depth += 1
+    try:
+        yield
+    finally:
+        depth -= 1
+        end = time.perf_counter()
+        record[2] = end - start
+        if depth == 0:
+            last_end = end
+
+
+def checkpoint(name):
+    """
+    Record a top level phase from the end of the previous one until now (e.g. the imports of a module)
+    :param name: Phase name
+    :return: None
+    """
+    global last_end
+
+    if total is not None or depth > 0:
+        return
+
+    end = time.perf_counter()
+    phases.append([name, 0, end - last_end])
+    last_end = end
+
+
+def finish():
+    """
+    Mark the application as ready (the next phases are not recorded) and print the timings if STARTUP_TIMINGS=1
+    :return: None
+    """
+    global total
+
+    if total is not None:
+        return
+
+    total = time.perf_counter() - started
+    if os.environ.get('STARTUP_TIMINGS', '0') == '1':
+        print(report(timings()), file=sys.stderr)
+
+
+def timings():
+    """
+    Get the startup timings
+    :return: Dict with the total seconds and the phases (name, depth and seconds)
+    """
+    return {
+        'total': total,
+        'phases': [{'name': name, 'depth': level, 'seconds': seconds} for name, level, seconds in phases],
+    }
+
+
+def report(startup_timings):
+    """
+    Format the startup timings
+    :param startup_timings: Timings (see timings)
+    :return: Report text
+    """
+    lines = ['{:<40} {:>9}'.format('Phase', 'ms')]
+    accounted = 0
+
+    for record in startup_timings['phases']:
+        lines.append('{:<40} {:>9.1f}'.format('  ' * record['depth'] + record['name'], record['seconds'] * 1000))
+        if record['depth'] == 0:
+            accounted += record['seconds']
+
+    if startup_timings['total'] is not None:
+        lines.append('{:<40} {:>9.1f}'.format('other', (startup_timings['total'] - accounted) * 1000))
+        lines.append('{:<40} {:>9.1f}'.format('total', startup_timings['total'] * 1000))
+
+    return '\n'.join(lines)
+
+
+def parse_import_times(text):
+    """
+    Parse the import time profile of python -X importtime
+    :param text: Standard error of the process
+    :return: List of tuples with the module, the self and the cumulative seconds (import order)
+    """
+    modules = []
+
+    for line in text.splitlines():
+        if not line.startswith('import time:'):
+            continue
+
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # Header line
+            continue
+
+        modules.append((fields[2].rstrip(), int(fields[0]) / 1e6, int(fields[1]) / 1e6))
+
+    return modules
+
+
+def imports_report(modules, limit=default_imports):
+    """
+    Format the modules with the longest import times
+    :param modules: Modules (see parse_import_times)
+    :param limit: Number of modules
+    :return: Report text
+    """
+    lines = ['{:<50} {:>9} {:>9}'.format('Import', 'self ms', 'total ms')]
+
+    for module, self_seconds, seconds in sorted(modules, key=lambda module: module[2], reverse=True)[:limit]:
+        lines.append('{:<50} {:>9.1f} {:>9.1f}'.format(module, self_seconds * 1000, seconds * 1000))
+
+    return '\n'.join(lines)
+
+
+def profile(module='wsgi'):
+    """
+    Load the application on a new process with the import time profile
+    :param module: Module that loads the application
+    :return: Tuple with the seconds until the process was ready, the startup timings and the import times
+    """
+    code = 'import json, sys, startup, {}; sys.stdout.write(json.dumps(startup.timings()))'.format(module)
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=dirname,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    seconds = time.perf_counter() - start
+
+    if process.returncode != 0:
+        raise RuntimeError('The application could not be loaded:\n{}'.format(
+            '\n'.join(line for line in process.stderr.splitlines() if not line.startswith('import time:'))))
+
+    return seconds, json.loads(process.stdout), parse_import_times(process.stderr)
+
+
+# Print the startup timings (e.g. python startup.py --budget 10)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Profile the startup of the dashboard')
+    parser.add_argument('--module', default='wsgi', help='module that loads the application')
+    parser.add_argument('--imports', type=int, default=default_imports, help='modules of the import report')
+    parser.add_argument('--budget', type=float, nargs='?', const=default_budget,
+                        help='max seconds to be ready (default STARTUP_BUDGET or {})'.format(default_budget))
+    arguments = parser.parse_args()
+
+    ready, startup_timings, import_times = profile(arguments.module)
+    print(report(startup_timings))
+    print()
+    print(imports_report(import_times, arguments.imports))
+    print()
+    # The profile makes the imports a bit slower, the budget includes the interpreter start
+    print('Ready in {:.2f} s'.format(ready))
+
+    if arguments.budget is not None and ready > arguments.budget:
+        print('Startup budget exceeded ({:.2f} s > {:.2f} s)'.format(ready, arguments.budget))
+        sys.exit(1)
@@ -0,0 +1,129 @@
+import argparse
+import csv
+import json
+import os
+import numpy as np
+import pandas as pd
+
+"""
+Synthetic dataset.
+Generate a companies file (same columns as the companies workbook) and a states geojson, so the dashboard
+can run offline and with any number of companies (e.g. for load tests).
+"""
+dirname = os.path.dirname(__file__)
+# Industries of the synthetic companies (the top 5 industries are the most common)
+industries = (
+    ('Retail', 0.2),
+    ('Food and beverages', 0.2),
+    ('Restaurants', 0.15),
+    ('Food production', 0.15),
+    ('Wholesale', 0.1),
+    ('Farming', 0.08),
+    ('Dairy', 0.06),
+    ('Wine and spirits', 0.06),
+)
+# Columns of the companies file
+columns = ('Name', 'Domain', 'Year founded', 'Industry', 'Locality', 'State', 'Id_locality', 'Linkedin url',
+           'Current employee estimate', 'Total employee estimate')
+# Rows written by chunk
+chunk_size = 50000
+
+
+def load_locations():
+    """
+    Read the locations file
+    :return: Locations data frame with state code
+    """
+    locations = pd.read_excel(os.path.join(dirname, 'assets/long-and-lat-by-state.xlsx'), dtype={'Fip': str})
+
+    return locations.dropna(subset=['Code', 'Latitude', 'Longitud']).reset_index(drop=True)
+
+
+def generate_companies(path, rows, seed=0, localities_by_state=20):
+    """
+    Write a CSV file with synthetic companies, chunk by chunk
+    :param path: CSV file path
+    :param rows: Number of companies
+    :param seed: Random seed
+    :param localities_by_state: Number of localities by state
+    :return: None
+    """
+    random = np.random.default_rng(seed)
+    codes = load_locations()['Code'].to_numpy(dtype=str)
+    industry_names = np.array([industry[0] for industry in industries])
+    industry_weights = np.array([industry[1] for industry in industries])
+
+    with open(path, 'w', newline='') as companies_file:
+        writer = csv.writer(companies_file)
+        writer.writerow(columns)
+
+        for start in range(0, rows, chunk_size):
+            size = min(chunk_size, rows - start)
+            ids = np.arange(start, start + size)
+            states = codes[random.integers(0, len(codes), size)]
+            localities = np.char.add('Locality ', random.integers(0, localities_by_state, size).astype(str))
+            years = random.integers(1950, 2021, size)
+            # Some companies don't have the founding year
+            years = np.where(random.random(size) < 0.1, 'missing', years.astype(str))
+            # Most of the companies are small
+            employees = np.minimum(random.pareto(1.1, size) * 10 + 1, 200000).astype(int)
+            names = np.char.add('Company ', ids.astype(str))
+            domains = np.char.add(np.char.add('company', ids.astype(str)), '.com')
+
+            writer.writerows(zip(
+                names,
+                domains,
+                years,
+                industry_names[random.choice(len(industry_names), size, p=industry_weights)],
+                localities,
+                states,
+                np.char.add(np.char.add(localities, ', '), states),
+                np.char.add('linkedin.com/company/', ids.astype(str)),
+                employees,
+                employees + random.integers(0, 100, size),
+            ))
+
+
+def generate_geojson(path, size=1.5):
+    """
+    Write a states geojson with a square around the center of every state (instead of the real borders)
+    :param path: Geojson file path
+    :param size: Size in degrees of the squares
+    :return: None
+    """
+    features = []
+
+    for _, location in load_locations().iterrows():
+        latitude, longitude = location['Latitude'], location['Longitud']
+        features.append({
+            'type': 'Feature',
+            'id': str(location['Fip']).zfill(2),
+            'properties': {'name': location['Name_stateuniversity']},
+            'geometry': {
+                'type': 'Polygon',
+                'coordinates': [[
+                    [longitude - size, latitude - size],
+                    [longitude + size, latitude - size],
+                    [longitude + size, latitude + size],
+                    [longitude - size, latitude + size],
+                    [longitude - size, latitude - size],
+                ]],
+            },
+        })
+
+    with open(path, 'w') as geojson_file:
+        json.dump({'type': 'FeatureCollection', 'features': features}, geojson_file)
+
+
+# Generate a synthetic dataset from the command line (e.g. python synthetic.py 100000 --output /tmp/synthetic)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic companies dataset')
+    parser.add_argument('rows', type=int, help='number of companies')
+    parser.add_argument('--output', default='.', help='output directory')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    arguments = parser.parse_args()
+
+    os.makedirs(arguments.output, exist_ok=True)
+    generate_companies(os.path.join(arguments.output, 'companies.csv'), arguments.rows, arguments.seed)
+    generate_geojson(os.path.join(arguments.output, 'us-states.json'))
+    print('Synthetic dataset written to {}'.format(arguments.output))
@@ -0,0 +1,71 @@
+import csv
+import os
+import ingestion
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+header = ['Name', 'Year founded', 'Current employee estimate', 'State']
+# Source rows (None is an empty row), the rows 4 and 7 of the source file are not valid
+source_rows = [
+    ['Bakery', '2001', '10', 'TX'],
+    None,
+    ['Brewery', 'never', '20', 'TX'],
+    ['Dairy', '2005', '30', 'CA'],
+    None,
+    ['Winery', '2010', '40', 'XX'],
+]
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingestion, 'cache_dirname', str(tmp_path / 'cache'))
+
+
+def write_source(path):
+    """
+    Write the source rows as a workbook or a CSV file (by extension)
+    """
+    if str(path).endswith('.csv'):
+        with open(path, 'w', newline='') as source_file:
+            writer = csv.writer(source_file)
+            writer.writerow(header)
+            for row in source_rows:
+                writer.writerow(row or [])
+        return
+
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.append(header)
+    for row in source_rows:
+        worksheet.append(row or [])
+    workbook.save(path)
+
+
+@pytest.mark.parametrize('name', ['companies.xlsx', 'companies.csv'])
+def test_quarantine_row_numbers(name, tmp_path, cache):
+    source = str(tmp_path / name)
+    write_source(source)
+
+    manifest = ingestion.ingest(source, {'TX', 'CA'}, size=2)
+
+    with open(os.path.join(ingestion.cache_path(source), ingestion.quarantine_name)) as quarantine_file:
+        quarantined = list(csv.DictReader(quarantine_file))
+
+    assert manifest['rows'] == 2
+    assert [(row['Row'], row['Name']) for row in quarantined] == [('4', 'Brewery'), ('7', 'Winery')]
+
+
+def test_locality_coordinates():
+    chunk = pd.DataFrame({
+        'Year founded': ['2000'] * 4,
+        'Current employee estimate': ['5'] * 4,
+        'State': ['TX'] * 4,
+        'Locality latitude': ['', '30.5', 'north', '95'],
+    })
+
+    valid_rows, quarantined_rows = ingestion.validate_chunk(chunk, {'TX'})
+
+    assert valid_rows['Locality latitude'].isna().tolist() == [True, False]
+    assert valid_rows['Locality latitude'].iloc[1] == 30.5
+    assert quarantined_rows['Reason'].tolist() == ['invalid locality latitude'] * 2
@@ -0,0 +1,62 @@
+import numpy as np
+import ranges
+
+edges = (0, 10, 50, 100, 200, 500, 1000)
+
+
+def companies(count=5000, seed=0):
+    generator = np.random.default_rng(seed)
+    groups = generator.integers(0, 7, count)
+    years = generator.integers(1990, 2020, count)
+    employees = generator.integers(0, 3000, count)
+
+    return groups, years, employees
+
+
+def test_totals_match_a_scan():
+    groups, years, employees = companies()
+    counts = ranges.RangeCounts(groups, 7, years, employees, edges)
+
+    for year_range in (None, (1995, 2005), (2019, 2019), (1800, 1900), (2010, 2000)):
+        companies_totals, employees_totals = counts.totals(year_range)
+        selected = np.ones(len(years), dtype=bool)
+        if year_range is not None:
+            selected = (years >= year_range[0]) & (years <= year_range[1])
+
+        assert (companies_totals.sum(axis=1) == np.bincount(groups[selected], minlength=7)).all()
+        assert np.allclose(employees_totals.sum(axis=1),
+                           np.bincount(groups[selected], weights=employees[selected], minlength=7))
+
+
+def test_aligned_employees_bins_match_a_scan():
+    groups, years, employees = companies()
+    counts = ranges.RangeCounts(groups, 7, years, employees, edges)
+    companies_totals, _ = counts.totals(None)
+
+    for employees_ranges in ([(0, 10)], [(11, 50), (501, 1000)], [(1001, float('inf'))]):
+        assert counts.aligned(employees_ranges)
+        selected = np.zeros(len(employees), dtype=bool)
+        for low, high in employees_ranges:
+            selected |= (employees >= low) & (employees <= high)
+
+        assert (companies_totals @ counts.employees_bins(employees_ranges) ==
+                np.bincount(groups[selected], minlength=7)).all()
+
+
+def test_unaligned_employees_ranges():
+    groups, years, employees = companies()
+    counts = ranges.RangeCounts(groups, 7, years, employees, edges)
+
+    assert not counts.aligned([(5, 50)])
+    assert not counts.aligned([(11, 60)])
+    assert counts.aligned(None)
+
+
+def test_cells_match_totals():
+    groups, years, employees = companies()
+    counts = ranges.RangeCounts(groups, 7, years, employees, edges)
+    cell_groups, cell_years, cell_companies = counts.cells((2000, 2009))
+
+    assert ((cell_years >= 2000) & (cell_years <= 2009)).all()
+    assert (np.bincount(cell_groups, weights=cell_companies.sum(axis=1), minlength=7) ==
+            counts.totals((2000, 2009))[0].sum(axis=1)).all()
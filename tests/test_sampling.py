@@ -0,0 +1,47 @@
+import numpy as np
+import sampling
+
+
+def strata(count=50000, seed=0):
+    # Some big strata and some strata smaller than the min stratum sample
+    return np.random.default_rng(seed).choice(12, count, p=[0.3, 0.2, 0.15, 0.1, 0.1, 0.05, 0.04, 0.03, 0.02,
+                                                           0.0005, 0.0003, 0.0092])
+
+
+def test_stratified_rows():
+    rows_strata = strata()
+    rows, population, sampled = sampling.stratified_rows(rows_strata, 5000)
+
+    assert (np.diff(rows) > 0).all()
+    assert (population == np.bincount(rows_strata)).all()
+    assert (np.bincount(rows_strata[rows], minlength=len(population)) == sampled).all()
+    # Every stratum is represented (all the rows of the small strata)
+    assert (sampled == np.minimum(population, np.maximum(sampled, sampling.min_stratum_sample))).all()
+
+
+def test_estimated_counts_cover_the_exact_counts():
+    rows_strata = strata()
+    groups = np.random.default_rng(1).integers(0, 4, len(rows_strata))
+    exact = np.bincount(groups, minlength=4)
+    covered = 0
+
+    for seed in range(20):
+        rows, population, sampled = sampling.stratified_rows(rows_strata, 5000, seed)
+        estimates, errors = sampling.estimate_counts(rows_strata[rows], groups[rows], 4, population, sampled)
+
+        # The weights of the sample add up to the companies
+        assert np.isclose(estimates.sum(), len(rows_strata))
+        covered += (np.abs(estimates - exact) <= errors).sum()
+
+    # 95% confidence intervals
+    assert covered / (20 * 4) >= 0.85
+
+
+def test_estimated_counts_of_full_strata_are_exact():
+    rows_strata = np.repeat(np.arange(3), 20)
+    groups = np.arange(60) % 2
+    rows, population, sampled = sampling.stratified_rows(rows_strata, 60)
+    estimates, errors = sampling.estimate_counts(rows_strata[rows], groups[rows], 2, population, sampled)
+
+    assert (estimates == np.bincount(groups)).all()
+    assert (errors == 0).all()
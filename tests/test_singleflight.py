@@ -0,0 +1,137 @@
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+import singleflight
+
+
+def concurrent_calls(flights, key, function, count=8):
+    """
+    Call a function on several threads at the same time
+    :return: List of results (or exceptions) of the threads
+    """
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def call(index):
+        barrier.wait()
+        try:
+            results[index] = flights.do(key, function)
+        except Exception as error:
+            results[index] = error
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return results
+
+
+def counted(calls, result=None, error=None):
+    def function():
+        calls.append(1)
+        time.sleep(0.2)
+        if error is not None:
+            raise error
+
+        return result
+
+    return function
+
+
+def test_call_key():
+    assert singleflight.call_key({'a': 1, 'b': [2]}) == singleflight.call_key({'b': [2], 'a': 1})
+    assert singleflight.call_key(['update', 1]) != singleflight.call_key(['update', 2])
+
+
+@pytest.mark.parametrize('shared', [False, True])
+def test_concurrent_calls_are_shared(shared, tmp_path):
+    flights = singleflight.SingleFlight(str(tmp_path) if shared else None)
+    calls = []
+
+    results = concurrent_calls(flights, 'key', counted(calls, {'rows': [1, 2]}))
+
+    assert len(calls) == 1
+    assert results == [{'rows': [1, 2]}] * len(results)
+    assert flights.calls == {}
+
+
+def process_call(dirname, barrier, results):
+    """
+    Call a shared function on a new process (the calls are recorded in a file shared by the processes)
+    """
+    def function():
+        with open(os.path.join(dirname, 'calls.txt'), 'a') as calls_file:
+            calls_file.write('{}\n'.format(os.getpid()))
+        time.sleep(0.5)
+
+        return {'rows': [1, 2]}
+
+    barrier.wait()
+    results.put(singleflight.SingleFlight(os.path.join(dirname, 'flights')).do('key', function))
+
+
+def test_concurrent_processes_are_shared(tmp_path):
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(4)
+    results = context.Queue()
+    processes = [context.Process(target=process_call, args=(str(tmp_path), barrier, results)) for _ in range(4)]
+
+    for process in processes:
+        process.start()
+    shared = [results.get(timeout=30) for _ in processes]
+    for process in processes:
+        process.join()
+
+    assert (tmp_path / 'calls.txt').read_text().count('\n') == 1
+    assert shared == [{'rows': [1, 2]}] * len(processes)
+
+
+def test_lock_files_are_kept(tmp_path):
+    flights = singleflight.SingleFlight(str(tmp_path))
+    flights.do('busy', lambda: None)
+    past = time.time() - singleflight.files_ttl - 1
+    os.utime(tmp_path / 'busy.lock', (past, past))
+    os.utime(tmp_path / 'busy.pickle', (past, past))
+
+    flights.do('key', lambda: None)
+
+    assert (tmp_path / 'busy.lock').exists()
+    assert not (tmp_path / 'busy.pickle').exists()
+
+
+def test_errors_are_shared():
+    flights = singleflight.SingleFlight()
+    calls = []
+
+    results = concurrent_calls(flights, 'key', counted(calls, error=ValueError('failed')))
+
+    assert len(calls) == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_results_are_not_cached(tmp_path):
+    flights = singleflight.SingleFlight(str(tmp_path))
+    calls = []
+
+    assert flights.do('key', counted(calls, 1)) == 1
+    assert flights.do('key', counted(calls, 2)) == 2
+    assert len(calls) == 2
+
+
+def test_calls_without_file_locks(tmp_path, monkeypatch):
+    # Non POSIX systems (no fcntl): the calls are shared by the threads only
+    monkeypatch.setattr(singleflight, 'fcntl', None)
+    flights = singleflight.SingleFlight(str(tmp_path))
+    calls = []
+
+    results = concurrent_calls(flights, 'key', counted(calls, 1))
+
+    assert len(calls) == 1
+    assert results == [1] * len(results)
+    assert list(tmp_path.iterdir()) == []
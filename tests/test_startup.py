@@ -0,0 +1,47 @@
+import os
+import shutil
+import ingestion
+import pytest
+import startup
+import synthetic
+
+# Companies of the synthetic dataset
+rows = int(os.environ.get('STARTUP_TEST_ROWS', '100000'))
+
+
+@pytest.fixture
+def synthetic_dataset(tmp_path, monkeypatch):
+    """
+    Use a synthetic dataset (offline) on the profiled processes, as loadtest.py --synthetic
+    """
+    monkeypatch.setenv('FOOD_AND_BEVERAGES_SOURCE', str(tmp_path / 'companies.csv'))
+    monkeypatch.setenv('US_STATES_GEOJSON', str(tmp_path / 'us-states.json'))
+    synthetic.generate_companies(os.environ['FOOD_AND_BEVERAGES_SOURCE'], rows)
+    synthetic.generate_geojson(os.environ['US_STATES_GEOJSON'])
+    yield
+
+    # Remove the ingestion cache of the dataset
+    shutil.rmtree(ingestion.cache_path(os.environ['FOOD_AND_BEVERAGES_SOURCE']), ignore_errors=True)
+    try:
+        os.remove(ingestion.cache_path(os.environ['FOOD_AND_BEVERAGES_SOURCE']) + '.lock')
+    except OSError:
+        pass
+
+
+def test_startup_budget(synthetic_dataset):
+    # The first process writes the ingestion cache (as the deploy does before the workers start)
+    startup.profile()
+
+    ready, timings, import_times = startup.profile()
+
+    assert ready <= startup.default_budget, '\n'.join((
+        'Startup budget exceeded ({:.2f} s > {:.2f} s)'.format(ready, startup.default_budget),
+        startup.report(timings),
+        startup.imports_report(import_times),
+    ))
+    # All the phases were recorded
+    names = [phase['name'] for phase in timings['phases']]
+    for name in ('imports', 'states geometry', 'states table', 'data load', 'merges', 'index build',
+                 'figure prebuild'):
+        assert name in names
+    assert timings['total'] is not None
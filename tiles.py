@@ -0,0 +1,151 @@
+import math
+import struct
+import zlib
+import numpy as np
+
+"""
+Density tiles.
+Companies are binned by latitude/longitude into a Web Mercator grid, one grid per zoom level,
+and every tile of the grid is rendered as a PNG image on the server. The map only requests the
+visible tiles instead of receiving every company as a point.
+"""
+# Size in pixels of every tile (same as the map base tiles)
+tile_size = 256
+# Size in pixels of every density cell inside the tile
+cell_size = 4
+# Number of density cells per tile side
+tile_cells = tile_size // cell_size
+# Zoom levels allowed for the tiles
+min_zoom = 0
+max_zoom = 12
+# Web Mercator latitude limit
+max_latitude = 85.0511
+# Density color (RGB), the alpha channel is computed with the number of companies in the cell
+density_color = (250, 64, 50)
+
+
+def project_cells(latitudes, longitudes, zoom):
+    """
+    Project coordinates to global density cells (Web Mercator)
+    :param latitudes: Array with latitudes
+    :param longitudes: Array with longitudes
+    :param zoom: Zoom level
+    :return: Tuple with the column and row of every cell
+    """
+    cells = tile_cells * 2 ** zoom
+    latitudes = np.radians(np.clip(np.asarray(latitudes, dtype=float), -max_latitude, max_latitude))
+    longitudes = np.asarray(longitudes, dtype=float)
+
+    x = (longitudes + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(latitudes) + 1.0 / np.cos(latitudes)) / math.pi) / 2.0
+
+    columns = np.clip((x * cells).astype(np.int64), 0, cells - 1)
+    rows = np.clip((y * cells).astype(np.int64), 0, cells - 1)
+
+    return columns, rows
+
+
+def density_grid(latitudes, longitudes, zoom):
+    """
+    Bin the coordinates into the density cells of a zoom level.
+    Only the cells with companies are stored (sorted by cell key) to keep the grid small at any zoom
+    :param latitudes: Array with latitudes
+    :param longitudes: Array with longitudes
+    :param zoom: Zoom level
+    :return: Tuple with the sorted cell keys, the companies by cell and the max companies found in a cell
+    """
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    # Companies without location are not drawn
+    located = ~(np.isnan(latitudes) | np.isnan(longitudes))
+    columns, rows = project_cells(latitudes[located], longitudes[located], zoom)
+
+    # One key by cell, the keys are sorted by tile and then by cell inside the tile
+    keys = cell_keys(columns // tile_cells, rows // tile_cells, columns % tile_cells, rows % tile_cells, zoom)
+    keys, counts = np.unique(keys, return_counts=True)
+    max_count = counts.max() if len(counts) > 0 else 0
+
+    return keys, counts, max_count
+
+
+def cell_keys(tile_x, tile_y, cell_x, cell_y, zoom):
+    """
+    Compute the integer key of the density cells
+    :param tile_x: Tile column
+    :param tile_y: Tile row
+    :param cell_x: Cell column inside the tile
+    :param cell_y: Cell row inside the tile
+    :param zoom: Zoom level
+    :return: Cell keys
+    """
+    tile = np.asarray(tile_y, dtype=np.int64) * 2 ** zoom + tile_x
+
+    return (tile * tile_cells + cell_y) * tile_cells + cell_x
+
+
+def tile_counts(grid, zoom, x, y):
+    """
+    Extract the companies by cell of a single tile
+    :param grid: Density grid (see density_grid)
+    :param zoom: Zoom level
+    :param x: Tile column
+    :param y: Tile row
+    :return: Matrix (tile_cells x tile_cells) with the companies by cell
+    """
+    keys, counts, _ = grid
+    counts_matrix = np.zeros(tile_cells * tile_cells, dtype=np.int64)
+
+    # The keys of a tile are contiguous because they are sorted by tile
+    first = cell_keys(x, y, 0, 0, zoom)
+    start, end = np.searchsorted(keys, (first, first + tile_cells * tile_cells))
+    counts_matrix[keys[start:end] - first] = counts[start:end]
+
+    return counts_matrix.reshape(tile_cells, tile_cells)
+
+
+def render_tile(grid, zoom, x, y):
+    """
+    Render a tile of the density grid as PNG image
+    :param grid: Density grid (see density_grid)
+    :param zoom: Zoom level
+    :param x: Tile column
+    :param y: Tile row
+    :return: PNG bytes
+    """
+    counts = tile_counts(grid, zoom, x, y)
+    max_count = grid[2]
+
+    # Use a logarithmic scale, so the cells with few companies are visible
+    alpha = np.zeros(counts.shape, dtype=np.uint8)
+    if max_count > 0:
+        alpha = (np.log1p(counts) / math.log1p(max_count) * 220).astype(np.uint8)
+        alpha[counts > 0] = np.maximum(alpha[counts > 0], 60)
+
+    # Scale the cells to the tile size
+    alpha = np.repeat(np.repeat(alpha, cell_size, axis=0), cell_size, axis=1)
+    pixels = np.empty((tile_size, tile_size, 4), dtype=np.uint8)
+    pixels[:, :, :3] = density_color
+    pixels[:, :, 3] = alpha
+
+    return encode_png(pixels)
+
+
+def encode_png(pixels):
+    """
+    Encode RGBA pixels as PNG image
+    :param pixels: Array (height x width x 4) with the pixels
+    :return: PNG bytes
+    """
+    height, width, _ = pixels.shape
+    # Every row starts with the filter type (0, none)
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = pixels.reshape(height, width * 4)
+
+    def chunk(chunk_type, data):
+        return struct.pack('>I', len(data)) + chunk_type + data + \
+               struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff)
+
+    return b'\x89PNG\r\n\x1a\n' + \
+        chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)) + \
+        chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)) + \
+        chunk(b'IEND', b'')